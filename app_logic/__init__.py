@@ -1,3 +1,10 @@
 __all__ = ["MainUi"]
 
-from .ui import MainUi
+
+def __getattr__(name: str):
+    # INFO: flet импортируется только для интерфейса, не для app_logic.processing
+    if name == "MainUi":
+        from .ui import MainUi
+
+        return MainUi
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,10 +1,14 @@
+import logging
 import os
 import re
 import sqlite3
 import sys
-from typing import Any, Final
+import threading
+import zipfile
+from dataclasses import dataclass
+from typing import Any, Final, Iterable, Iterator
+from xml.etree import ElementTree
 
-from docx2python import docx2python
 from platformdirs import user_data_dir
 
 from app_logic.types import OrderType, QuestionType
@@ -12,6 +16,154 @@ from app_logic.types import OrderType, QuestionType
 APP_NAME: Final[str] = "DocTemplater"
 APP_AUTHOR: Final[str] = "SSK"
 
+# INFO: размер кэша подготовленных запросов sqlite3 на соединение
+CACHED_STATEMENTS: Final[int] = 256
+PRAGMAS: Final[tuple[str, ...]] = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",  # 16 МБ
+    "PRAGMA mmap_size=268435456",  # 256 МБ
+    "PRAGMA temp_store=MEMORY",
+)
+
+# INFO: теги и атрибуты WordprocessingML для потокового чтения .docx
+W_NS: Final[str] = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_P: Final[str] = f"{W_NS}p"
+W_T: Final[str] = f"{W_NS}t"
+W_PPR: Final[str] = f"{W_NS}pPr"
+W_NUM_PR: Final[str] = f"{W_NS}numPr"
+W_NUM: Final[str] = f"{W_NS}num"
+W_ABSTRACT_NUM: Final[str] = f"{W_NS}abstractNum"
+W_LVL: Final[str] = f"{W_NS}lvl"
+W_NUM_FMT: Final[str] = f"{W_NS}numFmt"
+W_VAL: Final[str] = f"{W_NS}val"
+W_NUM_ID: Final[str] = f"{W_NS}numId"
+W_ILVL: Final[str] = f"{W_NS}ilvl"
+W_ABSTRACT_NUM_ID: Final[str] = f"{W_NS}abstractNumId"
+W_STYLE: Final[str] = f"{W_NS}style"
+W_STYLE_ID: Final[str] = f"{W_NS}styleId"
+W_TYPE: Final[str] = f"{W_NS}type"
+W_DEFAULT: Final[str] = f"{W_NS}default"
+W_BASED_ON: Final[str] = f"{W_NS}basedOn"
+W_P_STYLE: Final[str] = f"{W_NS}pStyle"
+W_OUTLINE_LVL: Final[str] = f"{W_NS}outlineLvl"
+
+# INFO: миграции схемы, после миграции N PRAGMA user_version = N
+# Новые изменения схемы добавляются только в конец
+MIGRATIONS: Final[tuple[tuple[str, ...], ...]] = (
+    (
+        """
+        CREATE TABLE IF NOT EXISTS questions (
+            id INTEGER PRIMARY KEY,
+            question UNICODE NOT NULL,
+            question_type TEXT CHECK (question_type IN ('theory', 'practice'))
+        )
+        """,
+    ),
+    (
+        """
+        CREATE INDEX IF NOT EXISTS idx_questions_type_id
+        ON questions(question_type, id)
+        """,
+    ),
+    (
+        # INFO: ё приводится к е в триггерах, unicode61 не сводит её сам.
+        # Тип вопроса в индексе, чтобы поиск фильтровал по нему в MATCH
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+            question,
+            question_type UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3 4 5'
+        )
+        """,
+        """
+        INSERT INTO questions_fts(rowid, question, question_type)
+        SELECT id, replace(replace(question, 'ё', 'е'), 'Ё', 'Е'), question_type
+        FROM questions
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT ON questions
+        BEGIN
+            INSERT INTO questions_fts(rowid, question, question_type)
+            VALUES (
+                new.id,
+                replace(replace(new.question, 'ё', 'е'), 'Ё', 'Е'),
+                new.question_type
+            );
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON questions
+        BEGIN
+            DELETE FROM questions_fts WHERE rowid = old.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS questions_fts_update
+        AFTER UPDATE OF question, question_type ON questions
+        BEGIN
+            UPDATE questions_fts
+            SET question = replace(replace(new.question, 'ё', 'е'), 'Ё', 'Е'),
+                question_type = new.question_type
+            WHERE rowid = old.id;
+        END
+        """,
+    ),
+    (
+        # INFO: версия банка растёт при каждом изменении вопросов,
+        # bank_id отличает пересозданную бд с той же версией
+        """
+        CREATE TABLE IF NOT EXISTS bank_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            bank_id TEXT NOT NULL,
+            version INTEGER NOT NULL
+        )
+        """,
+        """
+        INSERT OR IGNORE INTO bank_version(id, bank_id, version)
+        VALUES (1, lower(hex(randomblob(16))), 0)
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS questions_version_insert AFTER INSERT ON questions
+        BEGIN
+            UPDATE bank_version SET version = version + 1 WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS questions_version_delete AFTER DELETE ON questions
+        BEGIN
+            UPDATE bank_version SET version = version + 1 WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS questions_version_update AFTER UPDATE ON questions
+        BEGIN
+            UPDATE bank_version SET version = version + 1 WHERE id = 1;
+        END
+        """,
+    ),
+)
+
+
+@dataclass(frozen=True)
+class QuestionSnapshot:
+    """Вопросы обоих типов, прочитанные одной транзакцией, новые первыми."""
+
+    bank_id: str
+    version: int
+    practical: list[Any]
+    theoretical: list[Any]
+
+    @property
+    def key(self) -> str:
+        """Ключ состояния банка для кэшей"""
+        return f"{self.bank_id}:{self.version}"
+
+
+# INFO: одно соединение на поток для каждого файла бд
+_local = threading.local()
+
 
 def get_resource_path_temp(relative_path: str) -> str:
     """
@@ -26,63 +178,143 @@ def get_resource_path_temp(relative_path: str) -> str:
 
 
 class SqliteData:
-    def __init__(self) -> None:
-        data_dir = user_data_dir(APP_NAME, APP_AUTHOR)
-        os.makedirs(data_dir, exist_ok=True)
-
-        self.filepath = os.path.join(data_dir, "data.db")
-        con = sqlite3.connect(database=self.filepath, autocommit=True)
-        cur = con.cursor()
+    def __init__(self, filepath: str | None = None) -> None:
+        """filepath -- файл бд, по умолчанию data.db в папке данных приложения"""
+        if filepath is None:
+            data_dir = user_data_dir(APP_NAME, APP_AUTHOR)
+            os.makedirs(data_dir, exist_ok=True)
+            filepath = os.path.join(data_dir, "data.db")
+
+        self.filepath = filepath
+        self.migrate()
+
+    def migrate(self) -> None:
+        """Применяет недостающие миграции из MIGRATIONS"""
+        conn = self.connection()
+        (version,) = conn.execute("PRAGMA user_version").fetchone()
+        if version >= len(MIGRATIONS):
+            return
+
+        with conn:
+            # INFO: блокировка на запись, чтобы другой поток не применил те же миграции
+            conn.execute("BEGIN IMMEDIATE")
+            (version,) = conn.execute("PRAGMA user_version").fetchone()
+
+            for target, statements in enumerate(
+                MIGRATIONS[version:], start=version + 1
+            ):
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {target}")
+                logging.info(f"Database migrated to version {target}")
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        Возвращает соединение текущего потока.
 
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS questions (
-                id INTEGER PRIMARY KEY,
-                question UNICODE NOT NULL,
-                question_type TEXT CHECK (question_type IN ('theory', 'practice'))
+        Соединение создаётся при первом обращении из потока и переиспользуется
+        всеми экземплярами SqliteData с тем же файлом бд.
+        """
+        connections: dict[str, sqlite3.Connection] = _local.__dict__.setdefault(
+            "connections", {}
+        )
+        conn = connections.get(self.filepath)
+        if conn is None:
+            conn = sqlite3.connect(
+                database=self.filepath, cached_statements=CACHED_STATEMENTS
             )
-            """
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            connections[self.filepath] = conn
+        return conn
+
+    def close(self) -> None:
+        """Закрывает соединение текущего потока."""
+        connections: dict[str, sqlite3.Connection] = _local.__dict__.get(
+            "connections", {}
         )
+        conn = connections.pop(self.filepath, None)
+        if conn is not None:
+            conn.close()
 
-    def add_line(self, line: str, question_type: QuestionType):
-        with sqlite3.connect(self.filepath) as conn:
+    def add_line(self, line: str, question_type: QuestionType) -> int:
+        """Добавляет вопрос, возвращает его id"""
+        with self.connection() as conn:
             cur = conn.cursor()
             if not isinstance(line, str) or len(line.strip()) == 0:
                 raise ValueError(f"Wrong type: {type(line)}")
 
             sql = "INSERT INTO questions(question, question_type) VALUES(?,?)"
             cur.execute(sql, (line.strip(), question_type.value))
+            return cur.lastrowid or 0
 
-    def add_list(self, rows: list[str], question_type: QuestionType):
-        with sqlite3.connect(self.filepath) as conn:
-            cur = conn.cursor()
-            validated = []
+    def add_list(self, rows: list[str], question_type: QuestionType) -> list[int]:
+        """Добавляет вопросы одной транзакцией, возвращает их id по порядку"""
+        return list(self.add_iter(rows, question_type))
+
+    def add_iter(
+        self, rows: Iterable[str], question_type: QuestionType
+    ) -> dict[int, str]:
+        """
+        Добавляет вопросы из итератора одной транзакцией
+
+        Возвращает dict[id, вопрос] по порядку добавления. Строки не собираются
+        в список, при ошибке в любой из них не добавляется ни одна. rows
+        читаются внутри транзакции и не должны сами обращаться к бд.
+        """
 
+        def validated() -> Iterator[tuple[str, str]]:
             for question in rows:
                 if not isinstance(question, str):
                     raise ValueError(f"Invalid question: {question}")
                 elif len(question.strip()) == 0:
                     raise ValueError("Empty line")
 
-                validated.append((question.strip(), question_type.value))
+                yield question.strip(), question_type.value
+
+        with self.connection() as conn:
+            cur = conn.cursor()
+            # INFO: блокировка на запись до чтения max(id), чтобы новые id
+            # были только у вставленных этой транзакцией строк
+            cur.execute("BEGIN IMMEDIATE")
+            (max_before,) = cur.execute(
+                "SELECT COALESCE(MAX(id), 0) FROM questions"
+            ).fetchone()
 
             sql = "INSERT INTO questions(question, question_type) VALUES(?,?)"
-            cur.executemany(sql, validated)
+            cur.executemany(sql, validated())
+
+            sql = "SELECT id, question FROM questions WHERE id > ? ORDER BY id"
+            return {row[0]: row[1] for row in cur.execute(sql, (max_before,))}
+
+    def edit_questions(self, questions: dict[int, str]) -> int:
+        """
+        Изменяет вопросы одной транзакцией, возвращает количество изменённых
 
-    def edit_questions(self, questions: dict[int, str]):
-        with sqlite3.connect(self.filepath) as conn:
+        Строки с тем же текстом не перезаписываются.
+        """
+        with self.connection() as conn:
             cur = conn.cursor()
-            sql = "UPDATE questions SET question=? WHERE id=?"
-            params = [(question, idx) for idx, question in questions.items()]
+            sql = "UPDATE questions SET question=? WHERE id=? AND question IS NOT ?"
+            params = [(question, idx, question) for idx, question in questions.items()]
             cur.executemany(sql, params)
+            return max(cur.rowcount, 0)
 
     def remove_by_id(self, id: int):
-        with sqlite3.connect(self.filepath) as conn:
+        with self.connection() as conn:
             cur = conn.cursor()
             sql = "DELETE FROM questions WHERE id=?"
             params = (id,)
             cur.execute(sql, params)
 
+    def remove_by_ids(self, ids: Iterable[int]) -> int:
+        """Удаляет вопросы одной транзакцией, возвращает количество удалённых"""
+        with self.connection() as conn:
+            cur = conn.cursor()
+            sql = "DELETE FROM questions WHERE id=?"
+            cur.executemany(sql, ((id,) for id in ids))
+            return cur.rowcount
+
     def read_questions_dict(
         self,
         question_type: QuestionType,
@@ -95,7 +327,7 @@ class SqliteData:
         если в строку бд записано только число.
         """
 
-        with sqlite3.connect(self.filepath) as conn:
+        with self.connection() as conn:
             cur = conn.cursor()
 
             sql = f"""
@@ -119,7 +351,7 @@ class SqliteData:
         Sqlite может вернуть int или float,
         если в строку бд записано только число.
         """
-        with sqlite3.connect(self.filepath) as conn:
+        with self.connection() as conn:
             cur = conn.cursor()
 
             sql = f"""
@@ -133,6 +365,85 @@ class SqliteData:
             rows = result.fetchall()
             return [row[0] for row in rows]
 
+    def read_version(self) -> tuple[str, int]:
+        """Возвращает (bank_id, версия банка), версия растёт при любой записи"""
+        conn = self.connection()
+        row = conn.execute(
+            "SELECT bank_id, version FROM bank_version WHERE id = 1"
+        ).fetchone()
+        return row[0], row[1]
+
+    def read_snapshot(self) -> QuestionSnapshot:
+        """
+        Читает оба типа вопросов и версию банка одной транзакцией чтения
+
+        В WAL запись из другого потока или процесса не видна внутри
+        транзакции, поэтому списки и версия согласованы между собой.
+        """
+        conn = self.connection()
+        sql = """
+            SELECT question
+            FROM questions
+            WHERE question_type = ?
+            ORDER BY id DESC
+        """
+
+        conn.execute("BEGIN")
+        try:
+            bank_id, version = conn.execute(
+                "SELECT bank_id, version FROM bank_version WHERE id = 1"
+            ).fetchone()
+            practical = [
+                row[0] for row in conn.execute(sql, (QuestionType.PRACTICAL.value,))
+            ]
+            theoretical = [
+                row[0] for row in conn.execute(sql, (QuestionType.THEORETICAL.value,))
+            ]
+        finally:
+            conn.rollback()
+
+        return QuestionSnapshot(bank_id, version, practical, theoretical)
+
+    def search_questions(
+        self,
+        query: str,
+        question_type: QuestionType | None = None,
+        limit: int = 200,
+    ) -> dict[int, str | int | float]:
+        """
+        Полнотекстовый поиск, возвращает dict[ключ, вопрос] по релевантности
+
+        Каждое слово запроса ищется как префикс, регистр и ё/е не различаются.
+        """
+        match = fts_match_query(query)
+        if not match:
+            return {}
+
+        with self.connection() as conn:
+            cur = conn.cursor()
+
+            # INFO: ранжируются все совпадения нужного типа, текст вопроса
+            # берётся из questions, в индексе ё заменена на е
+            sql = """
+                WITH found AS (
+                    SELECT rowid AS id, rank
+                    FROM questions_fts
+                    WHERE questions_fts MATCH ?
+                    AND (? IS NULL OR question_type = ?)
+                    ORDER BY rank
+                    LIMIT ?
+                )
+                SELECT q.id, q.question
+                FROM found AS f
+                JOIN questions AS q ON q.id = f.id
+                ORDER BY f.rank
+            """
+
+            qtype = question_type.value if question_type else None
+            params = (match, qtype, qtype, limit)
+            result = cur.execute(sql, params)
+            return {row[0]: row[1] for row in result}
+
 
 class TextProcessing:
     def get_dict(self, filepath: str) -> list[str] | None:
@@ -151,26 +462,167 @@ class TextProcessing:
             return values
 
 
+def fts_match_query(query: str) -> str:
+    """Переводит текст из поля поиска в запрос FTS5: "слово1"* "слово2"*"""
+    words = re.findall(r"\w+", query.replace("ё", "е").replace("Ё", "Е"))
+    return " ".join(f'"{word}"*' for word in words)
+
+
 def clean_question_by_regex(regex, question: str) -> str:
     return re.sub(regex, "", question.strip()).strip()
 
 
-def docx_extract_questions(docx_path: str) -> list[str]:
-    """Return all numbered text from .docx"""
+def docx_numbered_levels(archive: zipfile.ZipFile) -> set[tuple[str, str]]:
+    """Возвращает (numId, ilvl) списков с номерами, без маркированных"""
+    try:
+        numbering = ElementTree.fromstring(archive.read("word/numbering.xml"))
+    except KeyError:
+        return set()
+
+    abstract_levels: dict[str, set[str]] = {}
+    for abstract in numbering.iter(W_ABSTRACT_NUM):
+        abstract_levels[abstract.get(W_ABSTRACT_NUM_ID, "")] = {
+            lvl.get(W_ILVL, "0")
+            for lvl in abstract.iter(W_LVL)
+            if (fmt := lvl.find(W_NUM_FMT)) is None
+            or fmt.get(W_VAL) not in ("bullet", "none")
+        }
+
+    levels: set[tuple[str, str]] = set()
+    for num in numbering.iter(W_NUM):
+        abstract_id = num.find(W_ABSTRACT_NUM_ID)
+        if abstract_id is None:
+            continue
+        for ilvl in abstract_levels.get(abstract_id.get(W_VAL, ""), ()):
+            levels.add((num.get(W_NUM_ID, ""), ilvl))
+    return levels
+
+
+@dataclass(frozen=True)
+class DocxNumbering:
+    """numPr и уровень структуры абзаца или стиля, None - значение не задано"""
+
+    num_id: str | None = None
+    ilvl: str | None = None
+    outline_lvl: str | None = None
+
+    def merge(self, base: "DocxNumbering") -> "DocxNumbering":
+        """Дополняет незаданные значения значениями базового стиля"""
+        return DocxNumbering(
+            self.num_id if self.num_id is not None else base.num_id,
+            self.ilvl if self.ilvl is not None else base.ilvl,
+            self.outline_lvl if self.outline_lvl is not None else base.outline_lvl,
+        )
+
+
+def docx_read_numbering(ppr: ElementTree.Element | None) -> DocxNumbering:
+    """Читает numPr и outlineLvl из w:pPr абзаца или стиля"""
+    if ppr is None:
+        return DocxNumbering()
+
+    num_id = ilvl = outline_lvl = None
+    if (num_pr := ppr.find(W_NUM_PR)) is not None:
+        if (element := num_pr.find(W_NUM_ID)) is not None:
+            num_id = element.get(W_VAL)
+        if (element := num_pr.find(W_ILVL)) is not None:
+            ilvl = element.get(W_VAL)
+    if (element := ppr.find(W_OUTLINE_LVL)) is not None:
+        outline_lvl = element.get(W_VAL)
+    return DocxNumbering(num_id, ilvl, outline_lvl)
+
+
+def docx_style_numbering(
+    archive: zipfile.ZipFile,
+) -> tuple[dict[str, DocxNumbering], str | None]:
+    """
+    Возвращает нумерацию стилей абзацев с учётом basedOn и стиль по умолчанию
+
+    Так нумеруются абзацы стилей вроде "List Number", у которых в самом
+    абзаце numPr нет.
+    """
+    try:
+        styles = ElementTree.fromstring(archive.read("word/styles.xml"))
+    except KeyError:
+        return {}, None
+
+    own: dict[str, DocxNumbering] = {}
+    based_on: dict[str, str] = {}
+    default_style = None
+    for style in styles.iter(W_STYLE):
+        if style.get(W_TYPE) != "paragraph":
+            continue
+        style_id = style.get(W_STYLE_ID, "")
+        own[style_id] = docx_read_numbering(style.find(W_PPR))
+        if (base := style.find(W_BASED_ON)) is not None:
+            based_on[style_id] = base.get(W_VAL, "")
+        if style.get(W_DEFAULT) in ("1", "true"):
+            default_style = style_id
+
+    resolved: dict[str, DocxNumbering] = {}
+    for style_id in own:
+        numbering = DocxNumbering()
+        chain: set[str] = set()
+        current: str | None = style_id
+        # INFO: в повреждённом файле basedOn может замкнуться в цикл
+        while current in own and current not in chain:
+            chain.add(current)
+            numbering = numbering.merge(own[current])
+            current = based_on.get(current)
+        resolved[style_id] = numbering
+    return resolved, default_style
+
+
+def docx_iter_questions(docx_path: str) -> Iterator[str]:
+    """
+    Потоково возвращает нумерованные абзацы из .docx
+
+    Читает word/document.xml через iterparse, не собирая текст документа целиком.
+    Вопросом считается абзац верхнего уровня (ilvl 0) нумерованного списка
+    Word, заданного в самом абзаце или через его стиль, или абзац, набранный
+    вручную как "1) текст". Подпункты и нумерованные заголовки пропускаются.
+    """
     # INFO: 1) Lorem Ipsum
     REGEX_NUM_AND_BRACKET_WITH_TEXT: Final[str] = r"\s*\d+\).*"
     # INFO: 1)
     REGEX_NUM_AND_BRACKET: Final[str] = r"\s*\d+\)"
 
-    with docx2python(docx_path) as docx_content:
-        document_text_list = re.sub(r"\t", "", (docx_content.text).replace("\t", ""))
-        questions_raw = re.findall(
-            REGEX_NUM_AND_BRACKET_WITH_TEXT,
-            document_text_list,
-        )
-        questions = [
-            cleaned
-            for q in questions_raw
-            if (cleaned := clean_question_by_regex(REGEX_NUM_AND_BRACKET, q)) != ""
-        ]
-    return questions
+    with zipfile.ZipFile(docx_path) as archive:
+        numbered_levels = docx_numbered_levels(archive)
+        styles, default_style = docx_style_numbering(archive)
+
+        with archive.open("word/document.xml") as document:
+            for _, paragraph in ElementTree.iterparse(document):
+                if paragraph.tag != W_P:
+                    continue
+
+                text = "".join(t.text or "" for t in paragraph.iter(W_T))
+                ppr = paragraph.find(W_PPR)
+                p_style = None if ppr is None else ppr.find(W_P_STYLE)
+                style_id = default_style if p_style is None else p_style.get(W_VAL)
+                numbering = docx_read_numbering(ppr).merge(
+                    styles.get(style_id or "", DocxNumbering())
+                )
+                paragraph.clear()
+
+                # INFO: numId 0 отменяет нумерацию, заданную стилем
+                if numbering.num_id not in (None, "0"):
+                    key = (numbering.num_id, numbering.ilvl or "0")
+                    if key in numbered_levels:
+                        # INFO: outlineLvl 9 - обычный текст, меньше - заголовок
+                        is_heading = numbering.outline_lvl not in (None, "9")
+                        if key[1] == "0" and not is_heading:
+                            if question := text.strip():
+                                yield question
+                        continue
+
+                if match := re.search(REGEX_NUM_AND_BRACKET_WITH_TEXT, text):
+                    question = clean_question_by_regex(
+                        REGEX_NUM_AND_BRACKET, match.group()
+                    )
+                    if question:
+                        yield question
+
+
+def docx_extract_questions(docx_path: str) -> list[str]:
+    """Return all numbered text from .docx"""
+    return list(docx_iter_questions(docx_path))
@@ -1,16 +1,66 @@
-import os
+import datetime as dt
+import importlib
 import logging
 import random
-import sys
-import tempfile
 import math
-from typing import Final, Iterable, List, Optional
-from docx.enum.text import WD_BREAK
-from docxtpl import DocxTemplate, RichText
-from docx import Document
-from docxcompose.composer import Composer
-from app_logic.processing.data import SqliteData, get_resource_path_temp
-from app_logic.types import QuestionType
+import threading
+import time
+from typing import Final, Iterator, Optional
+from app_logic.processing.output_cache import OutputCache, get_output_cache
+from app_logic.processing.data import QuestionSnapshot
+from app_logic.processing.repository import QuestionRepository, get_question_repository
+from app_logic.processing.sampler import QuestionSampler
+from app_logic.processing.timings import (
+    PHASE_BASE_RENDER,
+    PHASE_CACHE_LOOKUP,
+    PHASE_CACHE_STORE,
+    PHASE_QUESTIONS_IMPORT,
+    PHASE_TEMPLATE,
+    GenerationTimings,
+    timings_enabled,
+)
+from app_logic.types import PHASE_SAVE, QuestionType, RenderProgress
+
+# INFO: фиксированные даты свойств документа, чтобы результат зависел
+# только от входных данных и зерна
+DOCUMENT_TIMESTAMP: Final[dt.datetime] = dt.datetime(2000, 1, 1, tzinfo=dt.UTC)
+SEED_BITS: Final[int] = 32
+
+MONTHS_RU_GEN: Final[tuple[str, ...]] = (
+    "",
+    "января",
+    "февраля",
+    "марта",
+    "апреля",
+    "мая",
+    "июня",
+    "июля",
+    "августа",
+    "сентября",
+    "октября",
+    "ноября",
+    "декабря",
+)
+
+
+def format_ticket_date(date: dt.date) -> list[str]:
+    """Возвращает дату как DateRow.value: [год, месяц в род. падеже, день]"""
+    return [str(date.year), MONTHS_RU_GEN[date.month], str(date.day)]
+
+
+def prewarm_processing() -> threading.Thread:
+    """Загружает библиотеки рендера в фоновом потоке после запуска окна"""
+
+    def load() -> None:
+        start = time.perf_counter()
+        importlib.import_module("app_logic.processing.render")
+        templates = importlib.import_module("app_logic.processing.templates")
+        templates.get_template_registry().get(templates.DEFAULT_LAYOUT)
+        logging.info(f"Processing prewarmed in {time.perf_counter() - start:.3f}s")
+
+    thread = threading.Thread(target=load, name="prewarm", daemon=True)
+    thread.start()
+    return thread
 
 
 class DocxProcessingError(Exception):
@@ -31,13 +81,23 @@ class UnknownTicketTypeError(DocxProcessingError):
     pass
 
 
+class GenerationCancelledError(DocxProcessingError):
+    pass
+
+
+class UnknownLayoutError(DocxProcessingError):
+    pass
+
+
+class TemplateContextError(DocxProcessingError):
+    pass
+
+
 class Processing:
-    def __init__(self) -> None:
-        self.PATH_BASE_DOC: Final[str] = get_resource_path_temp(
-            "assets/templates/base.docx"
-        )
-        self.sql = SqliteData()
-        self.is_windows = sys.platform.startswith("win")
+    def __init__(self, questions: QuestionRepository | None = None) -> None:
+        self.questions = questions or get_question_repository()
+        # INFO: снимок банка, на котором строятся билеты текущей генерации
+        self.snapshot: QuestionSnapshot | None = None
 
         self.practical_questions: list[str] = []
         self.practical_questions_count: int = 0
@@ -45,16 +105,37 @@ class Processing:
         self.theoretical_questions: list[str] = []
         self.theoretical_questions_count: int = 0
 
-    def questions_import(self):
-        self.practical_questions: list[str] = self.sql.read_questions_list(
-            QuestionType.PRACTICAL
-        )
+        # INFO: None отключает кэш созданных документов
+        self.output_cache: OutputCache | None = get_output_cache()
+        # INFO: замеры этапов последнего создания документа
+        self.timings: GenerationTimings | None = None
+
+        self.random = random.Random()
+        self.samplers: dict[QuestionType, QuestionSampler] = {}
+
+    def questions_import(self) -> QuestionSnapshot:
+        """
+        Закрепляет снимок банка вопросов для генерации
+
+        Снимок перечитывается, только если версия банка изменилась,
+        в том числе из другого процесса.
+        """
+        if self.snapshot is not None:
+            if self.questions.read_version() == (
+                self.snapshot.bank_id,
+                self.snapshot.version,
+            ):
+                return self.snapshot
+
+        snapshot = self.questions.read_snapshot()
+        self.snapshot = snapshot
+
+        self.practical_questions: list[str] = snapshot.practical
         self.practical_questions_count: int = len(self.practical_questions)
 
-        self.theoretical_questions: list[str] = self.sql.read_questions_list(
-            QuestionType.THEORETICAL
-        )
+        self.theoretical_questions: list[str] = snapshot.theoretical
         self.theoretical_questions_count: int = len(self.theoretical_questions)
+        return snapshot
 
     def get_list_safe(
         self, items_list: list, index: int, fallback: Optional[bool] = False
@@ -67,7 +148,7 @@ class Processing:
             return str(item)
         except IndexError:
             if fallback:
-                item = str(random.choice(items_list))
+                item = str(self.random.choice(items_list))
                 return item
 
             return ""
@@ -92,39 +173,46 @@ class Processing:
         tickets_count_type: str,
         theoretical_rnd_type: str,
         practical_rnd_type: str,
-    ) -> (
-        None
-        | tuple[
-            tempfile._TemporaryFileWrapper,
-            List[tempfile._TemporaryFileWrapper],
-        ]
-    ):
+        workers: int = 1,
+        seed: int | None = None,
+        layout: str | None = None,
+        progress: RenderProgress | None = None,
+        cancel: threading.Event | None = None,
+    ) -> int:
+        """
+        Создаёт документ с билетами и возвращает зерно рандомизации.
+
+        workers -- количество процессов для рендера билетов.
+        seed -- зерно рандомизации вопросов, по умолчанию случайное. Одинаковые
+            данные и зерно дают одинаковый .docx, зерно пишется в свойства.
+            С заданным зерном документ берётся из OutputCache, если уже создавался.
+        layout -- имя шаблона из TemplateRegistry, по умолчанию base.
+        progress -- вызывается с (этап, готово, всего) по мере записи билетов.
+        cancel -- при установке прерывает создание с GenerationCancelledError.
+
+        Время этапов после создания доступно в self.timings.
+        """
         logging.info(
             f"subject: {subject}\nspec: {spec}\ncmk: {cmk}\ntutor: {tutor}\ndate: {date}\n"
         )
 
-        #  INFO: ОБНОВЛЕНИЕ ВОПРОСОВ
-        self.questions_import()
+        # INFO: docxtpl, python-docx и lxml загружаются при первом создании
+        # документа, чтобы не задерживать запуск, см. prewarm_processing
+        from docxtpl import RichText
 
-        match tickets_count_type:
-            case "Manual" if tickets_count is None or tickets_count <= 0:
-                raise InvalidNumberError("Неверное количество билетов")
-            case "Practical" if self.practical_questions_count <= 0:
-                raise NoQuestionsError("Нету практических вопросов")
-            case "Theoretical" if self.theoretical_questions_count <= 0:
-                raise NoQuestionsError("Нету теоретических вопросов")
+        from app_logic.processing.render import TicketRenderer, placeholder
+        from app_logic.processing.templates import (
+            DEFAULT_LAYOUT,
+            get_template_registry,
+        )
 
-            case "Manual" if tickets_count is not None:
-                tickets = range(tickets_count)
-            case "Practical":
-                tickets = range(self.practical_questions_count)
-            case "Theoretical":
-                tickets = range(self.theoretical_questions_count)
+        timings = GenerationTimings(save_to=save_to)
+        self.timings = timings
 
-            case _:
-                raise UnknownTicketTypeError(
-                    f"Неизвестный тип билетов: {tickets_count_type}"
-                )
+        with timings.phase(PHASE_TEMPLATE):
+            template_layout = get_template_registry().get(layout or DEFAULT_LAYOUT)
+        if template_layout is None:
+            raise UnknownLayoutError(f"Неизвестный шаблон билетов: {layout}")
 
         qualify = " (квалификационный)" if qualify_status else ""
         day = f"{int(date[2]):02}" or "__"  # add "0" to single num (1 = 01, 10 = 10)
@@ -154,50 +242,144 @@ class Processing:
             "month": rt_month,
             "year": year,
         }
-        tpl = DocxTemplate(self.PATH_BASE_DOC)
-
-        if len(tickets) == 1:
-            tickets_count_num: int = tickets[0]
-            question_one = self.get_selected_questions(
-                QuestionType.PRACTICAL, practical_rnd_type, tickets_count_num
-            )
-            question_two = self.get_selected_questions(
-                QuestionType.THEORETICAL, theoretical_rnd_type, tickets_count_num
+        missing = template_layout.missing(context)
+        if missing:
+            raise TemplateContextError(
+                f"Нет значений для полей шаблона: {', '.join(sorted(missing))}"
             )
-            context_extend = {
-                "ticket_num": str(tickets_count_num + 1),
-                "question_one": question_one,
-                "question_two": question_two,
-            }
-            context.update(context_extend)
-            tpl.render(context)
-            tpl.save(save_to)
-            return
-
-        context_extend = {
-            "ticket_num": "{{ticket_num}}",
-            "question_one": "{{question_one}}",
-            "question_two": "{{question_two}}",
+        # INFO: данные билета подставляются позже в TicketRenderer
+        for key in template_layout.ticket_variables:
+            context[key] = placeholder(key)
+
+        #  INFO: ОБНОВЛЕНИЕ ВОПРОСОВ
+        with timings.phase(PHASE_QUESTIONS_IMPORT):
+            snapshot = self.questions_import()
+        # INFO: без заданного зерна билеты каждый раз новые, кэшировать нечего
+        cache = self.output_cache if seed is not None else None
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(SEED_BITS)
+        self.random.seed(seed)
+        logging.info(f"Seed: {seed}")
+
+        # INFO: вопросов каждого типа в одном билете
+        practical = max(1, template_layout.slots_count(QuestionType.PRACTICAL))
+        theoretical = max(1, template_layout.slots_count(QuestionType.THEORETICAL))
+        self.samplers = {
+            QuestionType.PRACTICAL: QuestionSampler(
+                self.practical_questions_count, self.random, spacing=practical
+            ),
+            QuestionType.THEORETICAL: QuestionSampler(
+                self.theoretical_questions_count, self.random, spacing=theoretical
+            ),
         }
-        context.update(context_extend)
 
-        tmp_base_docx_file = tempfile.NamedTemporaryFile(
-            prefix="tmp_base_",
-            suffix=".docx",
-            delete=not self.is_windows,
-        )
+        match tickets_count_type:
+            case "Manual" if tickets_count is None or tickets_count <= 0:
+                raise InvalidNumberError("Неверное количество билетов")
+            case "Practical" if self.practical_questions_count <= 0:
+                raise NoQuestionsError("Нету практических вопросов")
+            case "Theoretical" if self.theoretical_questions_count <= 0:
+                raise NoQuestionsError("Нету теоретических вопросов")
+
+            case "Manual" if tickets_count is not None:
+                tickets = range(tickets_count)
+            case "Practical":
+                tickets = range(math.ceil(self.practical_questions_count / practical))
+            case "Theoretical":
+                tickets = range(
+                    math.ceil(self.theoretical_questions_count / theoretical)
+                )
+
+            case _:
+                raise UnknownTicketTypeError(
+                    f"Неизвестный тип билетов: {tickets_count_type}"
+                )
 
-        tpl.render(context)
-        tpl.save(tmp_base_docx_file.name)
-        tmp_docx_files = self.replace_questions(
-            status_rnd_practical=practical_rnd_type,
-            status_rnd_theoretical=theoretical_rnd_type,
-            tickets=tickets,
-            tpl_template_file=tmp_base_docx_file,
+        timings.tickets = len(tickets)
+        cache_key = ""
+        if cache is not None:
+            cache_key = cache.key(
+                {
+                    "subject": subject,
+                    "spec": spec,
+                    "cmk": cmk,
+                    "tutor": tutor,
+                    "date": date,
+                    "qualify": qualify,
+                    "tickets": len(tickets),
+                    "practical_rnd_type": practical_rnd_type,
+                    "theoretical_rnd_type": theoretical_rnd_type,
+                    "seed": seed,
+                    "layout": template_layout.name,
+                    "template": template_layout.digest,
+                    "questions": snapshot.key,
+                }
+            )
+            with timings.phase(PHASE_CACHE_LOOKUP):
+                timings.cached = cache.get(cache_key, save_to)
+            if timings.cached:
+                if progress is not None:
+                    progress(PHASE_SAVE, len(tickets), len(tickets))
+                self.finish_timings(timings)
+                return seed
+
+        with timings.phase(PHASE_BASE_RENDER):
+            tpl = get_template_registry().cache.render(template_layout.path, context)
+
+        def on_progress(phase: str, done: int, total: int):
+            if cancel is not None and cancel.is_set():
+                raise GenerationCancelledError("Создание документа отменено")
+            if progress is not None:
+                progress(phase, done, total)
+
+        properties = tpl.docx.core_properties
+        properties.identifier = f"seed:{seed}"
+        properties.created = DOCUMENT_TIMESTAMP
+        properties.modified = DOCUMENT_TIMESTAMP
+        properties.revision = 1
+
+        renderer = TicketRenderer(tpl.docx)
+        renderer.render(
+            self.replace_questions(
+                status_rnd_practical=practical_rnd_type,
+                status_rnd_theoretical=theoretical_rnd_type,
+                tickets=tickets,
+                slots=template_layout.slots,
+            ),
+            save_to,
+            workers=workers,
+            on_progress=on_progress,
+            timings=timings,
         )
 
-        self.docx_merge(tmp_docx_files, save_to)
-        return tmp_base_docx_file, tmp_docx_files
+        if cache is not None:
+            try:
+                with timings.phase(PHASE_CACHE_STORE):
+                    cache.put(cache_key, save_to)
+            except OSError as e:
+                logging.warning(f"Can't cache document {save_to}: {e}")
+
+        self.finish_timings(timings)
+        return seed
+
+    def finish_timings(self, timings: GenerationTimings) -> None:
+        """Завершает замеры, при DOCTEMPLATER_TIMINGS=1 пишет их в лог"""
+        timings.finish()
+        if timings_enabled():
+            timings.log()
+
+    def get_sampler(self, question_type: QuestionType) -> QuestionSampler:
+        """Возвращает выборку вопросов типа, созданную для текущего списка"""
+        if question_type == QuestionType.PRACTICAL:
+            size = self.practical_questions_count
+        else:
+            size = self.theoretical_questions_count
+
+        sampler = self.samplers.get(question_type)
+        if sampler is None or len(sampler) != size:
+            sampler = QuestionSampler(size, self.random)
+            self.samplers[question_type] = sampler
+        return sampler
 
     def get_selected_questions(
         self,
@@ -210,14 +392,16 @@ class Processing:
         elif question_type == QuestionType.THEORETICAL:
             questions_list = self.theoretical_questions
 
-        if questions_list is None:
+        if not questions_list:
             return ""
 
+        # INFO: случайные вопросы берутся из QuestionSampler без повторов,
+        # чтобы вопросы распределялись по билетам равномерно
         match status_rnd:
-            case "fallback":
-                question = self.get_list_safe(questions_list, question_index, True)
-            case "always":
-                question = random.choice(questions_list)
+            case "fallback" if question_index < len(questions_list):
+                question = questions_list[question_index]
+            case "fallback" | "always":
+                question = questions_list[self.get_sampler(question_type).draw()]
             case "none":
                 question = self.get_list_safe(questions_list, question_index)
             case _:
@@ -229,75 +413,52 @@ class Processing:
         status_rnd_practical: str,
         status_rnd_theoretical: str,
         tickets: range,
-        tpl_template_file: tempfile._TemporaryFileWrapper,
-    ) -> list[tempfile._TemporaryFileWrapper]:
-        """Replace questions"""
-
-        tpl = DocxTemplate(tpl_template_file.name)
-        tmpfiles = []
+        slots: tuple[tuple[str, QuestionType], ...] = (
+            ("question_one", QuestionType.PRACTICAL),
+            ("question_two", QuestionType.THEORETICAL),
+        ),
+    ) -> Iterator[dict[str, str]]:
+        """
+        Возвращает значения билетов для TicketRenderer
+
+        slots -- поля вопросов шаблона, см. TemplateLayout.slots. Если в билете
+        несколько вопросов одного типа, билет i берёт их подряд с i * n.
+        В режиме "fallback" билет, которому вопросов по порядку не хватает,
+        берёт все вопросы этого типа случайно.
+        """
+        statuses = {
+            QuestionType.PRACTICAL: status_rnd_practical,
+            QuestionType.THEORETICAL: status_rnd_theoretical,
+        }
+        counts = {
+            QuestionType.PRACTICAL: self.practical_questions_count,
+            QuestionType.THEORETICAL: self.theoretical_questions_count,
+        }
+        per_ticket = {
+            qtype: sum(1 for _, slot_type in slots if slot_type == qtype)
+            for qtype in QuestionType
+        }
 
         for i in tickets:
-            tmpfile = tempfile.NamedTemporaryFile(
-                prefix=f"tmp_{i}", suffix=".docx", delete=not self.is_windows
-            )
-            question_one = self.get_selected_questions(
-                QuestionType.PRACTICAL, status_rnd_practical, i
-            )
-            question_two = self.get_selected_questions(
-                QuestionType.THEORETICAL, status_rnd_theoretical, i
-            )
-
-            context = {
-                "ticket_num": f"{i+1}",
-                "question_one": question_one,
-                "question_two": question_two,
+            values = {"ticket_num": f"{i+1}"}
+            taken = dict.fromkeys(QuestionType, 0)
+
+            # INFO: иначе случайный вопрос может совпасть со взятым по порядку
+            # в том же билете, выбор подряд из QuestionSampler не повторяется
+            ticket_statuses = {
+                qtype: (
+                    "always"
+                    if status == "fallback"
+                    and (i + 1) * per_ticket[qtype] > counts[qtype]
+                    else status
+                )
+                for qtype, status in statuses.items()
             }
-            tpl.render(context)
-            tpl.save(tmpfile.name)
-            tmpfiles.append(tmpfile)
-        return tmpfiles
-
-    def docx_merge(
-        self, paths: list[tempfile._TemporaryFileWrapper], save_to: str
-    ) -> None:
-        """Merge temporary files"""
-        master = Document(paths[0])
-        composer = Composer(master)
-
-        # master file page break
-        master.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
-
-        for idx, tmp in enumerate(paths[1:], start=1):
-            doc = Document(tmp.name)
-            composer.append(doc)
-            if idx != len(paths) - 1:
-                master.add_page_break()
-        composer.save(save_to)
-
-    def clean(
-        self,
-        path: Optional[tempfile._TemporaryFileWrapper] = None,
-        paths: Optional[Iterable[tempfile._TemporaryFileWrapper]] = None,
-    ):
-        if path is None and paths is None:
-            return
-
-        all_paths = []
-        if path is not None:
-            all_paths.append(path)
-        if paths is not None:
-            all_paths.extend(paths)
-
-        # clean temporary files
-        for file in all_paths:
-            try:
-                file_path = file.name
-                # Deletes files on UNIX
-                # And makes sure it closes before deleting on non UNIX
-                if not file.closed:
-                    file.close()
-                # Deletes files on non UNIX systems
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            except Exception as e:
-                logging.error(f"Failed to delete {file.name}: {e}")
+
+            for name, qtype in slots:
+                values[name] = self.get_selected_questions(
+                    qtype, ticket_statuses[qtype], i * per_ticket[qtype] + taken[qtype]
+                )
+                taken[qtype] += 1
+
+            yield values
@@ -0,0 +1,182 @@
+import logging
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Final, Iterable, Iterator
+from xml.etree import ElementTree
+
+from app_logic.processing.data import TextProcessing, docx_iter_questions
+from app_logic.processing.repository import QuestionRepository
+from app_logic.types import QuestionType
+
+IMPORT_EXTENSIONS: Final[tuple[str, ...]] = (".docx", ".txt")
+
+
+@dataclass
+class FileImportResult:
+    """Результат разбора одного файла."""
+
+    path: str
+    questions: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+    error: str | None = None
+
+
+@dataclass
+class BatchImportReport:
+    """Итог пакетного импорта."""
+
+    files: list[FileImportResult]
+    added: int = 0
+    duplicates: int = 0
+    save_seconds: float = 0.0
+
+    @property
+    def failed(self) -> list[FileImportResult]:
+        return [result for result in self.files if result.error is not None]
+
+
+# INFO: (результат файла, разобрано файлов, всего файлов)
+ImportProgress = Callable[[FileImportResult, int, int], None]
+
+
+def collect_import_files(paths: Iterable[str]) -> list[str]:
+    """Раскрывает папки и возвращает .docx/.txt файлы в порядке обхода"""
+    files: list[str] = []
+
+    for path in paths:
+        if not os.path.isdir(path):
+            if path.lower().endswith(IMPORT_EXTENSIONS):
+                files.append(path)
+            continue
+
+        for root, dirs, filenames in os.walk(path):
+            dirs.sort()
+            files.extend(
+                os.path.join(root, filename)
+                for filename in sorted(filenames)
+                # INFO: ~$file.docx -- файлы блокировки Word
+                if filename.lower().endswith(IMPORT_EXTENSIONS)
+                and not filename.startswith("~$")
+            )
+    return files
+
+
+def parse_question_file(path: str) -> FileImportResult:
+    """Разбирает файл с вопросами, выполняется в процессе пула"""
+    start = time.perf_counter()
+    result = FileImportResult(path)
+
+    try:
+        if path.lower().endswith(".docx"):
+            result.questions = list(docx_iter_questions(path))
+        else:
+            result.questions = TextProcessing().get_dict(path) or []
+    # INFO: ошибка одного файла не должна прерывать разбор остальных
+    except (
+        OSError,
+        UnicodeDecodeError,
+        zipfile.BadZipFile,
+        KeyError,
+        ValueError,
+        ElementTree.ParseError,
+    ) as error:
+        result.error = f"{type(error).__name__}: {error}"
+
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def question_key(question: str) -> str:
+    """Ключ для поиска повторов: без учёта регистра и лишних пробелов"""
+    return " ".join(str(question).split()).casefold()
+
+
+class BatchImporter:
+    """
+    Пакетный импорт вопросов из многих файлов.
+
+    Файлы разбираются параллельно в пуле процессов, вопросы без повторов
+    (в том числе уже сохранённых в бд) записываются одной транзакцией,
+    не собираясь в один список.
+    """
+
+    def __init__(
+        self, repository: QuestionRepository, workers: int | None = None
+    ) -> None:
+        self.repository = repository
+        self.workers = workers or os.cpu_count() or 1
+
+    def parse(
+        self, paths: list[str], on_progress: ImportProgress | None = None
+    ) -> list[FileImportResult]:
+        """Разбирает файлы, результаты возвращаются в порядке paths"""
+        results: dict[str, FileImportResult] = {}
+        if not paths:
+            return []
+
+        # INFO: spawn -- импорт запускается из фонового потока интерфейса,
+        # fork копирует процесс с захваченными другими потоками блокировками
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(paths)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            futures = [pool.submit(parse_question_file, path) for path in paths]
+            for done, future in enumerate(as_completed(futures), start=1):
+                result = future.result()
+                results[result.path] = result
+                logging.info(
+                    f"Imported {result.path}: {len(result.questions)} questions "
+                    f"in {result.seconds:.3f}s"
+                )
+                if on_progress is not None:
+                    on_progress(result, done, len(paths))
+
+        return [results[path] for path in paths]
+
+    def iter_unique(
+        self, results: list[FileImportResult], question_type: QuestionType
+    ) -> Iterator[str]:
+        """Новые вопросы по порядку файлов, без повторов и уже сохранённых"""
+        # INFO: сохранённые вопросы читаются сразу, а не при первом next(),
+        # который выполняется уже внутри транзакции записи
+        seen = {
+            question_key(question)
+            for question in self.repository.read_questions_list(question_type)
+        }
+
+        def unique() -> Iterator[str]:
+            for result in results:
+                for question in result.questions:
+                    key = question_key(question)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    yield question
+
+        return unique()
+
+    def save(
+        self, results: list[FileImportResult], question_type: QuestionType
+    ) -> BatchImportReport:
+        """Записывает вопросы без повторов одной транзакцией"""
+        start = time.perf_counter()
+        ids = self.repository.add_iter(
+            self.iter_unique(results, question_type), question_type
+        )
+        total = sum(len(result.questions) for result in results)
+
+        report = BatchImportReport(
+            files=results,
+            added=len(ids),
+            duplicates=total - len(ids),
+            save_seconds=time.perf_counter() - start,
+        )
+        logging.info(
+            f"Batch import: {report.added} added, {report.duplicates} duplicates, "
+            f"{len(report.failed)} failed files, saved in {report.save_seconds:.3f}s"
+        )
+        return report
@@ -0,0 +1,115 @@
+import logging
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from app_logic.processing.docx import GenerationCancelledError, Processing
+from app_logic.types import PHASE_QUEUED
+
+
+@dataclass(eq=False)
+class GenerationJob:
+    """Задание на создание документа, params -- аргументы process_docx."""
+
+    params: dict[str, Any]
+    on_progress: Callable[["GenerationJob", str, int, int], None] | None = None
+    on_done: Callable[["GenerationJob", Exception | None], None] | None = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def save_to(self) -> str:
+        return self.params["save_to"]
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+
+
+class GenerationRunner:
+    """
+    Очередь создания документов в фоновом потоке.
+
+    Задания выполняются по одному в порядке добавления, колбэки
+    on_progress и on_done вызываются из фонового потока. Только этап
+    PHASE_QUEUED сообщается из submit, до того как задание может начаться.
+    """
+
+    def __init__(self, processing: Processing | None = None) -> None:
+        self.processing = processing or Processing()
+        self.current: GenerationJob | None = None
+
+        self._queue: queue.Queue[GenerationJob] = queue.Queue()
+        self._jobs: list[GenerationJob] = []
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def pending(self) -> int:
+        """Количество заданий в очереди, включая выполняемое"""
+        with self._lock:
+            return len(self._jobs)
+
+    def submit(
+        self,
+        params: dict[str, Any],
+        on_progress: Callable[[GenerationJob, str, int, int], None] | None = None,
+        on_done: Callable[[GenerationJob, Exception | None], None] | None = None,
+    ) -> GenerationJob:
+        job = GenerationJob(params, on_progress, on_done)
+
+        with self._lock:
+            self._jobs.append(job)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="generation", daemon=True
+                )
+                self._thread.start()
+
+        # INFO: до постановки в очередь, иначе быстрое задание может
+        # завершиться раньше, чем интерфейс покажет, что оно ожидает
+        if on_progress is not None:
+            on_progress(job, PHASE_QUEUED, 0, 0)
+        self._queue.put(job)
+        return job
+
+    def cancel_all(self) -> None:
+        """Отменяет текущее и все ожидающие задания"""
+        with self._lock:
+            for job in self._jobs:
+                job.cancel()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            self.current = job
+            error: Exception | None = None
+
+            try:
+                if job.cancelled:
+                    raise GenerationCancelledError("Создание документа отменено")
+
+                on_progress = None
+                if job.on_progress is not None:
+                    callback = job.on_progress
+
+                    def on_progress(phase: str, done: int, total: int):
+                        callback(job, phase, done, total)
+
+                self.processing.process_docx(
+                    **job.params, progress=on_progress, cancel=job.cancel_event
+                )
+            except Exception as e:
+                error = e
+                if not isinstance(e, GenerationCancelledError):
+                    logging.exception(f"Generation failed: {job.save_to}")
+            finally:
+                self.current = None
+                with self._lock:
+                    self._jobs.remove(job)
+
+            if job.on_done is not None:
+                job.on_done(job, error)
@@ -0,0 +1,129 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from typing import Any, Final
+
+from platformdirs import user_data_dir
+
+from app_logic.processing.data import APP_AUTHOR, APP_NAME
+
+OUTPUT_CACHE_DIR: Final[str] = "output_cache"
+OUTPUT_CACHE_MAX_BYTES: Final[int] = 256 * 1024 * 1024
+# INFO: увеличить при изменении рендера, чтобы не отдавать старые документы
+OUTPUT_CACHE_VERSION: Final[int] = 1
+
+
+class OutputCache:
+    """
+    Кэш созданных документов по хэшу входных данных.
+
+    Файл кэша -- <ключ>.docx, время изменения файла обновляется при каждом
+    попадании, при превышении max_bytes удаляются давно не использованные.
+    """
+
+    def __init__(
+        self, directory: str | None = None, max_bytes: int = OUTPUT_CACHE_MAX_BYTES
+    ) -> None:
+        self.directory = directory or os.path.join(
+            user_data_dir(APP_NAME, APP_AUTHOR), OUTPUT_CACHE_DIR
+        )
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(inputs: dict[str, Any]) -> str:
+        """Ключ кэша: sha256 от входных данных в каноническом JSON"""
+        payload = json.dumps(
+            {"version": OUTPUT_CACHE_VERSION, **inputs},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.docx")
+
+    def get(self, key: str, save_to: str) -> bool:
+        """Копирует документ из кэша в save_to, возвращает False при промахе"""
+        path = self.path(key)
+        try:
+            shutil.copyfile(path, save_to)
+        except FileNotFoundError:
+            return False
+
+        # INFO: документ уже скопирован, поэтому ошибка обновления mtime
+        # (файл удалён другим процессом или только для чтения) лишь
+        # сбивает порядок вытеснения и не должна ломать генерацию
+        try:
+            os.utime(path)
+        except OSError as error:
+            logging.warning(f"Output cache utime failed: {key[:12]}: {error}")
+
+        logging.info(f"Output cache hit: {key[:12]}")
+        return True
+
+    def put(self, key: str, source: str) -> None:
+        """Сохраняет копию документа в кэш и удаляет лишнее"""
+        os.makedirs(self.directory, exist_ok=True)
+
+        # INFO: сначала во временный файл, чтобы другой процесс
+        # не прочитал недописанный документ
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        os.close(fd)
+        try:
+            shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.evict()
+
+    def evict(self) -> int:
+        """Удаляет давно не использованные документы сверх max_bytes"""
+        with self._lock:
+            try:
+                entries = [
+                    entry
+                    for entry in os.scandir(self.directory)
+                    if entry.is_file() and entry.name.endswith(".docx")
+                ]
+            except FileNotFoundError:
+                return 0
+
+            stats = sorted(
+                ((entry.stat(), entry.path) for entry in entries),
+                key=lambda item: item[0].st_mtime,
+            )
+            total = sum(stat.st_size for stat, _ in stats)
+            removed = 0
+
+            for stat, path in stats:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= stat.st_size
+                removed += 1
+
+        if removed:
+            logging.info(f"Output cache evicted {removed} documents")
+        return removed
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+@functools.cache
+def get_output_cache() -> OutputCache:
+    """Общий кэш документов приложения"""
+    return OutputCache()
@@ -0,0 +1,296 @@
+import copy
+import io
+import math
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Final, Generator, Iterable, Iterator
+
+from docx.document import Document as DocxDocument
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+from docx.oxml.xmlchemy import BaseOxmlElement
+from lxml import etree
+
+from app_logic.processing.timings import (
+    PHASE_SELECT,
+    PHASE_SERIALIZE,
+    PHASE_TICKET_RENDER,
+    PHASE_WRITE,
+    GenerationTimings,
+)
+from app_logic.types import PHASE_RENDER, PHASE_SAVE, RenderProgress
+
+PAGE_BREAK_XML: Final[str] = (
+    f'<w:p {nsdecls("w")}><w:r><w:br w:type="page"/></w:r></w:p>'
+)
+BODY_XML: Final[str] = f'<w:body {nsdecls("w")}/>'
+
+# INFO: одинаковое время у частей пакета, чтобы одинаковые билеты давали
+# одинаковый .docx байт в байт
+ZIP_DATE_TIME: Final[tuple[int, int, int, int, int, int]] = (1980, 1, 1, 0, 0, 0)
+
+# INFO: меньше билетов дешевле отрендерить в одном процессе
+PARALLEL_MIN_TICKETS: Final[int] = 50
+CHUNKS_PER_WORKER: Final[int] = 4
+
+# INFO: (значения билета, замена numId или None для первого билета)
+TicketJob = tuple[dict[str, str], dict[str, str] | None]
+
+# INFO: (XML части, количество билетов в ней)
+RenderedParts = Generator[tuple[bytes, int], None, None]
+
+
+def placeholder(key: str) -> str:
+    """Возвращает заглушку jinja, которую оставляет первый рендер шаблона."""
+    return "{{%s}}" % key
+
+
+def stamp(
+    prototype: Iterable[BaseOxmlElement],
+    values: dict[str, str],
+    num_mapping: dict[str, str] | None = None,
+) -> list[BaseOxmlElement]:
+    """Возвращает копию прототипа с подставленными значениями."""
+    replacements = {placeholder(key): value for key, value in values.items()}
+    elements = [copy.deepcopy(element) for element in prototype]
+
+    for element in elements:
+        for text in element.iter(qn("w:t")):
+            value = text.text
+            if not value or "{{" not in value:
+                continue
+            for old, new in replacements.items():
+                value = value.replace(old, new)
+            text.text = value
+
+        if not num_mapping:
+            continue
+        for num_id in element.iter(qn("w:numId")):
+            val = num_id.get(qn("w:val"))
+            if val in num_mapping:
+                num_id.set(qn("w:val"), num_mapping[val])
+    return elements
+
+
+def render_jobs(prototype: Iterable[BaseOxmlElement], jobs: list[TicketJob]) -> bytes:
+    """
+    Возвращает XML билетов для вставки в w:body без обёртки.
+
+    Перед каждым билетом, кроме первого в документе, ставится разрыв страницы.
+    """
+    partial = parse_xml(BODY_XML)
+
+    for values, num_mapping in jobs:
+        if num_mapping is not None:
+            partial.append(parse_xml(PAGE_BREAK_XML))
+        partial.extend(stamp(prototype, values, num_mapping))
+
+    # INFO: обёртка объявляет только w:, как и корень document.xml
+    xml = etree.tostring(partial)
+    if xml.endswith(b"/>"):
+        return b""
+    return xml[xml.index(b">") + 1 : xml.rindex(b"</w:body>")]
+
+
+def render_chunk(prototype_xml: bytes, jobs: list[TicketJob]) -> bytes:
+    """Рендерит часть билетов в отдельном процессе."""
+    return render_jobs(parse_xml(prototype_xml), jobs)
+
+
+class TicketRenderer:
+    """
+    Размножает отрендеренное тело шаблона по билетам в памяти.
+
+    Тело документа (без sectPr) снимается один раз и служит прототипом,
+    каждый билет -- копия прототипа с подставленными значениями.
+    Стили, колонтитулы и связи общие, так как все билеты из одного шаблона.
+    """
+
+    def __init__(self, document: DocxDocument) -> None:
+        self.document = document
+        self.body = document.element.body
+
+        sect_pr = self.body.get_or_add_sectPr()
+        self.prototype: list[BaseOxmlElement] = [
+            child for child in self.body.iterchildren() if child is not sect_pr
+        ]
+        for child in self.prototype:
+            self.body.remove(child)
+
+        # INFO: numId -> ilvl списков прототипа, нумерация перезапускается в билете
+        self.num_levels: dict[int, set[int]] = {}
+        for element in self.prototype:
+            for num_pr in element.iter(qn("w:numPr")):
+                num_id = num_pr.find(qn("w:numId"))
+                ilvl = num_pr.find(qn("w:ilvl"))
+                if num_id is None:
+                    continue
+                levels = self.num_levels.setdefault(int(num_id.get(qn("w:val"))), set())
+                levels.add(0 if ilvl is None else int(ilvl.get(qn("w:val"))))
+
+    def _restart_numbering(self) -> dict[str, str]:
+        """Создаёт новые w:num с startOverride и возвращает замену numId."""
+        if not self.num_levels:
+            return {}
+
+        numbering = self.document.part.numbering_part.element
+        mapping: dict[str, str] = {}
+
+        for num_id, levels in self.num_levels.items():
+            num = numbering.num_having_numId(num_id)
+            new_num = numbering.add_num(num.abstractNumId.val)
+            for ilvl in sorted(levels):
+                new_num.add_lvlOverride(ilvl).add_startOverride(1)
+            mapping[str(num_id)] = str(new_num.numId)
+        return mapping
+
+    def _prototype_xml(self) -> bytes:
+        partial = parse_xml(BODY_XML)
+        partial.extend(copy.deepcopy(element) for element in self.prototype)
+        return etree.tostring(partial)
+
+    def _render_sequential(self, jobs: list[TicketJob]) -> RenderedParts:
+        for job in jobs:
+            yield render_jobs(self.prototype, [job]), 1
+
+    def _render_parallel(self, jobs: list[TicketJob], workers: int) -> RenderedParts:
+        """Делит билеты на части по процессам и отдаёт их по порядку."""
+        prototype_xml = self._prototype_xml()
+
+        chunk_size = math.ceil(len(jobs) / (workers * CHUNKS_PER_WORKER))
+        chunks = [
+            jobs[start : start + chunk_size]
+            for start in range(0, len(jobs), chunk_size)
+        ]
+
+        # INFO: при отмене оставшиеся части не рендерятся. spawn -- рендер
+        # запускается из фонового потока интерфейса, fork копирует процесс
+        # с захваченными другими потоками блокировками
+        executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        try:
+            partials = executor.map(render_chunk, [prototype_xml] * len(chunks), chunks)
+            yield from zip(partials, map(len, chunks))
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def _track(
+        self,
+        parts: RenderedParts,
+        total: int,
+        on_progress: RenderProgress | None,
+        timings: GenerationTimings,
+    ) -> Iterator[bytes]:
+        done = 0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    part, count = next(parts)
+                except StopIteration:
+                    break
+                timings.add(PHASE_TICKET_RENDER, time.perf_counter() - start, count)
+
+                yield part
+                done += count
+                if on_progress is not None:
+                    on_progress(PHASE_RENDER, done, total)
+        finally:
+            parts.close()
+
+        if on_progress is not None:
+            on_progress(PHASE_SAVE, done, total)
+
+    def _write_package(
+        self, parts: Iterable[bytes], save_to: str, timings: GenerationTimings
+    ) -> None:
+        """
+        Записывает документ, потоково вставляя билеты в word/document.xml.
+
+        Остальные части пакета (стили, нумерация, колонтитулы, связи)
+        сериализуются один раз вместе с пустым телом шаблона.
+        """
+        with timings.phase(PHASE_SERIALIZE):
+            package = io.BytesIO()
+            self.document.save(package)
+        document_xml = self.document.part.partname.membername
+
+        # INFO: рендер билетов идёт внутри записи, его время вычитается
+        rendered = timings.phases.get(PHASE_TICKET_RENDER)
+        render_before = rendered.seconds if rendered else 0.0
+        start = time.perf_counter()
+
+        try:
+            with (
+                zipfile.ZipFile(package) as source,
+                zipfile.ZipFile(save_to, "w", zipfile.ZIP_DEFLATED) as target,
+            ):
+                for info in source.infolist():
+                    target_info = zipfile.ZipInfo(info.filename, ZIP_DATE_TIME)
+                    target_info.compress_type = zipfile.ZIP_DEFLATED
+
+                    if info.filename != document_xml:
+                        target.writestr(target_info, source.read(info))
+                        continue
+
+                    # INFO: в теле остался только sectPr, билеты пишутся перед ним
+                    xml = source.read(info)
+                    split_at = xml.rindex(b"<w:sectPr")
+
+                    with target.open(target_info, "w") as stream:
+                        stream.write(xml[:split_at])
+                        for part in parts:
+                            stream.write(part)
+                        stream.write(xml[split_at:])
+        except BaseException:
+            # INFO: недописанный документ не оставляется на диске
+            if os.path.exists(save_to):
+                os.remove(save_to)
+            raise
+
+        rendered = timings.phases.get(PHASE_TICKET_RENDER)
+        render_seconds = (rendered.seconds if rendered else 0.0) - render_before
+        timings.add(PHASE_WRITE, time.perf_counter() - start - render_seconds)
+
+    def render(
+        self,
+        tickets: Iterable[dict[str, str]],
+        save_to: str,
+        workers: int = 1,
+        on_progress: RenderProgress | None = None,
+        timings: GenerationTimings | None = None,
+    ) -> None:
+        """
+        Записывает билеты через разрыв страницы в save_to.
+
+        При workers > 1 и большом числе билетов рендер идёт в пуле процессов,
+        порядок билетов сохраняется. Билеты не накапливаются в памяти,
+        а сразу пишутся в архив документа.
+
+        on_progress вызывается после каждой записанной части; исключение
+        из него прерывает запись, а недописанный файл удаляется.
+        timings -- куда добавить время этапов, см. GenerationTimings.
+        """
+        if timings is None:
+            timings = GenerationTimings()
+
+        # INFO: нумерация согласуется заранее, чтобы numId не зависел от процесса
+        start = time.perf_counter()
+        jobs: list[TicketJob] = [
+            (values, self._restart_numbering() if idx else None)
+            for idx, values in enumerate(tickets)
+        ]
+        timings.add(PHASE_SELECT, time.perf_counter() - start, len(jobs))
+
+        if workers > 1 and len(jobs) >= PARALLEL_MIN_TICKETS:
+            parts = self._render_parallel(jobs, workers)
+        else:
+            parts = self._render_sequential(jobs)
+
+        self._write_package(
+            self._track(parts, len(jobs), on_progress, timings), save_to, timings
+        )
@@ -0,0 +1,178 @@
+import functools
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
+
+from app_logic.processing.data import QuestionSnapshot, SqliteData
+from app_logic.types import QuestionType
+
+
+@dataclass
+class QuestionChange:
+    """Изменение вопросов одного типа."""
+
+    question_type: QuestionType
+    added: dict[int, Any] = field(default_factory=dict)
+    updated: dict[int, Any] = field(default_factory=dict)
+    removed: list[int] = field(default_factory=list)
+
+
+QuestionListener = Callable[[QuestionChange], None]
+
+
+class QuestionRepository:
+    """
+    Кэш вопросов поверх SqliteData.
+
+    Вопросы каждого типа читаются из бд один раз и хранятся по возрастанию id,
+    записи применяются к кэшу точечно и рассылаются подписчикам.
+    """
+
+    def __init__(self, sqlite: SqliteData | None = None) -> None:
+        self.sqlite = sqlite or SqliteData()
+        self._lock = threading.RLock()
+        self._cache: dict[QuestionType, dict[int, Any]] = {}
+        self._listeners: list[QuestionListener] = []
+
+    def subscribe(self, listener: QuestionListener) -> None:
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: QuestionListener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _emit(self, change: QuestionChange) -> None:
+        if not (change.added or change.updated or change.removed):
+            return
+        for listener in list(self._listeners):
+            listener(change)
+
+    def _questions(self, question_type: QuestionType) -> dict[int, Any]:
+        """Возвращает кэш типа, загружает его при первом обращении"""
+        with self._lock:
+            cache = self._cache.get(question_type)
+            if cache is None:
+                cache = dict(
+                    reversed(self.sqlite.read_questions_dict(question_type).items())
+                )
+                self._cache[question_type] = cache
+            return cache
+
+    def _question_type_of(self, idx: int) -> QuestionType | None:
+        for question_type in QuestionType:
+            if idx in self._questions(question_type):
+                return question_type
+        return None
+
+    def invalidate(self, question_type: QuestionType | None = None) -> None:
+        """Сбрасывает кэш, например после записи в бд в обход репозитория"""
+        with self._lock:
+            if question_type is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(question_type, None)
+
+    def read_questions_dict(self, question_type: QuestionType) -> dict[int, Any]:
+        """Возвращает копию dict[id, вопрос], новые вопросы первыми"""
+        with self._lock:
+            return dict(reversed(self._questions(question_type).items()))
+
+    def read_questions_list(self, question_type: QuestionType) -> list[Any]:
+        """Возвращает list[вопрос], новые вопросы первыми"""
+        with self._lock:
+            return list(reversed(self._questions(question_type).values()))
+
+    def read_version(self) -> tuple[str, int]:
+        """Версия банка в бд, см. SqliteData.read_version"""
+        return self.sqlite.read_version()
+
+    def read_snapshot(self) -> QuestionSnapshot:
+        """Согласованный снимок обоих типов из бд, минуя кэш"""
+        return self.sqlite.read_snapshot()
+
+    def search_questions(
+        self,
+        query: str,
+        question_type: QuestionType | None = None,
+        limit: int = 200,
+    ) -> dict[int, Any]:
+        """Полнотекстовый поиск в бд, см. SqliteData.search_questions"""
+        return self.sqlite.search_questions(query, question_type, limit)
+
+    def add_list(self, rows: list[str], question_type: QuestionType) -> list[int]:
+        return self.add_iter(rows, question_type)
+
+    def add_iter(self, rows: Iterable[str], question_type: QuestionType) -> list[int]:
+        """
+        Добавляет вопросы из итератора одной транзакцией
+
+        Кэш обновляется и подписчики получают событие только после записи,
+        блокировка кэша на время записи не берётся, чтобы не задерживать чтение.
+        """
+        added = self.sqlite.add_iter(rows, question_type)
+
+        with self._lock:
+            self._questions(question_type).update(added)
+
+        self._emit(QuestionChange(question_type, added=added))
+        return list(added)
+
+    def edit_questions(self, questions: dict[int, str]) -> int:
+        """
+        Записывает только изменённые вопросы, возвращает их количество
+
+        Вопросы с тем же текстом, что в кэше, в бд не отправляются.
+        """
+        changes: dict[QuestionType, QuestionChange] = {}
+
+        with self._lock:
+            for idx, question in questions.items():
+                question_type = self._question_type_of(idx)
+                if question_type is None:
+                    continue
+                if self._questions(question_type)[idx] == question:
+                    continue
+                change = changes.setdefault(
+                    question_type, QuestionChange(question_type)
+                )
+                change.updated[idx] = question
+
+            changed = {
+                idx: question
+                for change in changes.values()
+                for idx, question in change.updated.items()
+            }
+            modified = self.sqlite.edit_questions(changed) if changed else 0
+            for change in changes.values():
+                self._questions(change.question_type).update(change.updated)
+
+        for change in changes.values():
+            self._emit(change)
+        return modified
+
+    def remove_by_ids(self, ids: Iterable[int]) -> int:
+        """Удаляет вопросы одной транзакцией, возвращает количество удалённых"""
+        ids = list(ids)
+        changes: dict[QuestionType, QuestionChange] = {}
+
+        with self._lock:
+            removed = self.sqlite.remove_by_ids(ids)
+            for idx in ids:
+                question_type = self._question_type_of(idx)
+                if question_type is None:
+                    continue
+                self._questions(question_type).pop(idx)
+                change = changes.setdefault(
+                    question_type, QuestionChange(question_type)
+                )
+                change.removed.append(idx)
+
+        for change in changes.values():
+            self._emit(change)
+        return removed
+
+
+@functools.cache
+def get_question_repository() -> QuestionRepository:
+    """Общий репозиторий вопросов приложения"""
+    return QuestionRepository()
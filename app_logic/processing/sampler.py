@@ -0,0 +1,49 @@
+import random
+
+
+class QuestionSampler:
+    """
+    Случайный выбор вопросов без повторов.
+
+    Индексы вопросов выдаются как перестановка (Фишер-Йетс по одному шагу
+    на выбор), после выдачи всех начинается новая эпоха. За любую серию
+    выборов каждый вопрос использован одинаковое число раз с разницей
+    не больше одного.
+
+    spacing -- сколько выборов подряд не повторяются и на стыке эпох,
+    обычно количество вопросов этого типа в билете.
+    """
+
+    def __init__(self, size: int, rng: random.Random, spacing: int = 1) -> None:
+        self.rng = rng
+        self.order: list[int] = list(range(size))
+        self.position = 0
+        self.epoch = 0
+        self.spacing = min(spacing, size // 2)
+        self._recent: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def draw(self) -> int:
+        """Возвращает индекс следующего вопроса"""
+        size = len(self.order)
+        if not size:
+            raise IndexError("Нет вопросов для выбора")
+
+        if self.position == size:
+            # INFO: последние вопросы эпохи не должны открывать следующую
+            self._recent = set(self.order[size - self.spacing :])
+            self.position = 0
+            self.epoch += 1
+
+        position = self.position
+        swap = self.rng.randrange(position, size)
+        if position < self.spacing:
+            while self.order[swap] in self._recent:
+                swap = self.rng.randrange(position, size)
+
+        order = self.order
+        order[position], order[swap] = order[swap], order[position]
+        self.position += 1
+        return order[position]
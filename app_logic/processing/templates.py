@@ -0,0 +1,319 @@
+import copy
+import functools
+import hashlib
+import io
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Final
+
+import jinja2
+from docx.document import Document as DocxDocument
+from docxtpl import DocxTemplate
+
+from app_logic.processing.data import get_resource_path_temp
+from app_logic.types import QuestionType
+
+TEMPLATES_DIR: Final[str] = "assets/templates"
+DEFAULT_LAYOUT: Final[str] = "base"
+
+TICKET_NUM_KEY: Final[str] = "ticket_num"
+# INFO: поля base.docx, у новых шаблонов поля вида question_theory_1
+LEGACY_SLOTS: Final[dict[str, QuestionType]] = {
+    "question_one": QuestionType.PRACTICAL,
+    "question_two": QuestionType.THEORETICAL,
+}
+SLOT_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"^question_(%s)_(\d+)$" % "|".join(qtype.value for qtype in QuestionType)
+)
+
+
+class CompiledTemplateEnvironment(jinja2.Environment):
+    """
+    Окружение jinja, которое компилирует одинаковый исходник один раз.
+
+    DocxTemplate.render передаёт в from_string XML частей документа,
+    для неизменного шаблона он одинаков от генерации к генерации.
+    """
+
+    def __init__(self, **options: Any) -> None:
+        super().__init__(**options)
+        self._compiled: dict[str, jinja2.Template] = {}
+        self._compiled_lock = threading.Lock()
+
+    def from_string(  # type: ignore[override]
+        self, source, globals=None, template_class=None
+    ):
+        if (
+            globals is not None
+            or template_class is not None
+            or not isinstance(source, str)
+        ):
+            return super().from_string(source, globals, template_class)
+
+        with self._compiled_lock:
+            template = self._compiled.get(source)
+            if template is None:
+                template = super().from_string(source)
+                self._compiled[source] = template
+            return template
+
+
+@dataclass(frozen=True)
+class PreparedParts:
+    """Разобранный документ шаблона и XML его частей, подготовленный для jinja."""
+
+    document: DocxDocument
+    body: str
+    # INFO: {тип связи колонтитула: {rId: (XML, кодировка)}}
+    headers_footers: dict[str, dict[str, tuple[str, str]]]
+
+
+class PreparedDocxTemplate(DocxTemplate):
+    """
+    DocxTemplate поверх подготовленных частей CachedTemplate.
+
+    docxtpl при каждом рендере заново открывает пакет, разбирает тело и
+    колонтитулы и чистит их XML для jinja (patch_xml). Здесь документ
+    копируется из уже разобранного, а XML частей берётся готовым.
+    """
+
+    def __init__(self, template: "CachedTemplate") -> None:
+        super().__init__(io.BytesIO(template.data))
+        self.prepared = template.prepared
+
+    def init_docx(self, reload: bool = True):
+        # INFO: рендер заменяет тело и колонтитулы, поэтому нужна копия
+        if not self.docx or (self.is_rendered and reload):
+            self.docx = copy.deepcopy(self.prepared.document)
+            self.is_rendered = False
+
+    def build_xml(self, context, jinja_env=None):
+        return self.render_xml_part(
+            self.prepared.body, self.docx._part, context, jinja_env
+        )
+
+    def build_headers_footers_xml(self, context, uri, jinja_env=None):
+        rels = self.docx._part.rels
+        for rel_key, (xml, encoding) in self.prepared.headers_footers[uri].items():
+            part = rels[rel_key].target_part
+            xml = self.render_xml_part(xml, part, context, jinja_env)
+            yield rel_key, xml.encode(encoding)
+
+
+@dataclass(eq=False)
+class CachedTemplate:
+    """Шаблон .docx в памяти: байты файла, разобранные и скомпилированные части."""
+
+    path: str
+    mtime_ns: int
+    digest: str
+    data: bytes
+    jinja_env: CompiledTemplateEnvironment = field(
+        default_factory=CompiledTemplateEnvironment
+    )
+    _variables: frozenset[str] | None = field(default=None, repr=False)
+    _prepared: PreparedParts | None = field(default=None, repr=False)
+    _prepare_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def variables(self) -> frozenset[str]:
+        """Переменные jinja шаблона, разбираются один раз"""
+        if self._variables is None:
+            self._variables = frozenset(
+                self.open().get_undeclared_template_variables(self.jinja_env)
+            )
+        return self._variables
+
+    @property
+    def prepared(self) -> PreparedParts:
+        """Документ и XML частей для рендера, разбираются один раз"""
+        with self._prepare_lock:
+            if self._prepared is None:
+                tpl = self.open()
+                tpl.init_docx()
+                headers_footers: dict[str, dict[str, tuple[str, str]]] = {}
+                for uri in (tpl.HEADER_URI, tpl.FOOTER_URI):
+                    parts = headers_footers[uri] = {}
+                    for rel_key, part in tpl.get_headers_footers(uri):
+                        xml = tpl.get_part_xml(part)
+                        encoding = tpl.get_headers_footers_encoding(xml)
+                        parts[rel_key] = (tpl.patch_xml(xml), encoding)
+                self._prepared = PreparedParts(
+                    tpl.docx, tpl.patch_xml(tpl.get_xml()), headers_footers
+                )
+            return self._prepared
+
+    def open(self) -> DocxTemplate:
+        """Новый DocxTemplate из байтов в памяти, без чтения с диска"""
+        return DocxTemplate(io.BytesIO(self.data))
+
+    def render(self, context: dict[str, Any]) -> DocxTemplate:
+        tpl = PreparedDocxTemplate(self)
+        tpl.render(context, self.jinja_env)
+        return tpl
+
+
+class TemplateCache:
+    """
+    Кэш шаблонов .docx по пути, времени изменения и хэшу содержимого.
+
+    При каждом обращении проверяется mtime файла, изменённый файл
+    перечитывается, а скомпилированные части сбрасываются только если
+    изменилось содержимое.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._templates: dict[str, CachedTemplate] = {}
+
+    def get(self, path: str) -> CachedTemplate:
+        path = os.path.abspath(path)
+        mtime_ns = os.stat(path).st_mtime_ns
+
+        with self._lock:
+            cached = self._templates.get(path)
+            if cached is not None and cached.mtime_ns == mtime_ns:
+                return cached
+
+            with open(path, "rb") as file:
+                data = file.read()
+            digest = hashlib.sha256(data).hexdigest()
+
+            if cached is not None and cached.digest == digest:
+                cached.mtime_ns = mtime_ns
+                return cached
+
+            template = CachedTemplate(path, mtime_ns, digest, data)
+            self._templates[path] = template
+            logging.info(f"Template loaded: {path} ({digest[:12]})")
+            return template
+
+    def render(self, path: str, context: dict[str, Any]) -> DocxTemplate:
+        return self.get(path).render(context)
+
+    def invalidate(self, path: str | None = None) -> None:
+        """Сбрасывает кэш шаблона или всех шаблонов"""
+        with self._lock:
+            if path is None:
+                self._templates.clear()
+            else:
+                self._templates.pop(os.path.abspath(path), None)
+
+
+@functools.cache
+def get_template_cache() -> TemplateCache:
+    """Общий кэш шаблонов приложения"""
+    return TemplateCache()
+
+
+def slot_sort_key(name: str) -> tuple[int, str, int]:
+    match = SLOT_PATTERN.match(name)
+    if match is None:
+        return (0, name, 0)
+    return (1, match.group(1), int(match.group(2)))
+
+
+@dataclass(frozen=True)
+class TemplateLayout:
+    """Раскладка билета: шаблон и его поля."""
+
+    name: str
+    path: str
+    digest: str
+    variables: frozenset[str]
+    # INFO: (поле вопроса, тип вопроса) в порядке выбора вопросов
+    slots: tuple[tuple[str, QuestionType], ...]
+
+    @classmethod
+    def from_template(cls, name: str, template: CachedTemplate) -> "TemplateLayout":
+        slots = []
+        for variable in sorted(template.variables, key=slot_sort_key):
+            match = SLOT_PATTERN.match(variable)
+            if variable in LEGACY_SLOTS:
+                slots.append((variable, LEGACY_SLOTS[variable]))
+            elif match is not None:
+                slots.append((variable, QuestionType(match.group(1))))
+        return cls(
+            name, template.path, template.digest, template.variables, tuple(slots)
+        )
+
+    @property
+    def ticket_variables(self) -> frozenset[str]:
+        """Поля, которые заполняются для каждого билета"""
+        return frozenset(name for name, _ in self.slots) | {TICKET_NUM_KEY}
+
+    @property
+    def document_variables(self) -> frozenset[str]:
+        """Поля, которые заполняются один раз на документ"""
+        return self.variables - self.ticket_variables
+
+    def slots_count(self, question_type: QuestionType) -> int:
+        return sum(1 for _, qtype in self.slots if qtype == question_type)
+
+    def missing(self, context: dict[str, Any]) -> set[str]:
+        """Возвращает поля документа, которых нет в context"""
+        return set(self.document_variables - context.keys())
+
+
+class TemplateRegistry:
+    """
+    Шаблоны .docx из папки, имя раскладки -- имя файла без расширения.
+
+    Переменные каждого шаблона разбираются один раз и пересчитываются
+    только при изменении файла, см. TemplateCache.
+    """
+
+    def __init__(
+        self, directory: str | None = None, cache: TemplateCache | None = None
+    ) -> None:
+        self.directory = directory or get_resource_path_temp(TEMPLATES_DIR)
+        self.cache = cache or get_template_cache()
+        self._lock = threading.Lock()
+        self._layouts: dict[str, tuple[CachedTemplate, TemplateLayout]] = {}
+
+    def paths(self) -> dict[str, str]:
+        """Находит шаблоны в папке: {имя раскладки: путь}"""
+        try:
+            entries = sorted(os.scandir(self.directory), key=lambda e: e.name)
+        except FileNotFoundError:
+            return {}
+        return {
+            entry.name[: -len(".docx")]: entry.path
+            for entry in entries
+            # INFO: ~$file.docx -- файлы блокировки Word
+            if entry.is_file()
+            and entry.name.lower().endswith(".docx")
+            and not entry.name.startswith("~$")
+        }
+
+    def names(self) -> list[str]:
+        return list(self.paths())
+
+    def get(self, name: str) -> TemplateLayout | None:
+        path = self.paths().get(name)
+        if path is None:
+            return None
+
+        template = self.cache.get(path)
+        with self._lock:
+            cached = self._layouts.get(name)
+            if cached is not None and cached[0] is template:
+                return cached[1]
+
+        layout = TemplateLayout.from_template(name, template)
+        with self._lock:
+            self._layouts[name] = (template, layout)
+        logging.info(
+            f"Template layout {name}: {len(layout.slots)} question fields, "
+            f"document fields {sorted(layout.document_variables)}"
+        )
+        return layout
+
+
+@functools.cache
+def get_template_registry() -> TemplateRegistry:
+    """Общий реестр шаблонов приложения"""
+    return TemplateRegistry()
@@ -0,0 +1,78 @@
+import contextlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Final, Iterator
+
+# INFO: DOCTEMPLATER_TIMINGS=1 пишет замеры каждой генерации строкой JSON в лог
+TIMINGS_ENV: Final[str] = "DOCTEMPLATER_TIMINGS"
+
+PHASE_QUESTIONS_IMPORT: Final[str] = "questions_import"
+PHASE_TEMPLATE: Final[str] = "template"
+PHASE_CACHE_LOOKUP: Final[str] = "cache_lookup"
+PHASE_BASE_RENDER: Final[str] = "base_render"
+PHASE_SELECT: Final[str] = "select_questions"
+PHASE_TICKET_RENDER: Final[str] = "ticket_render"
+PHASE_SERIALIZE: Final[str] = "serialize"
+PHASE_WRITE: Final[str] = "write"
+PHASE_CACHE_STORE: Final[str] = "cache_store"
+
+
+def timings_enabled() -> bool:
+    return os.environ.get(TIMINGS_ENV, "").lower() in ("1", "true", "yes")
+
+
+@dataclass
+class PhaseTiming:
+    seconds: float = 0.0
+    count: int = 0
+
+
+@dataclass
+class GenerationTimings:
+    """Время и количество по этапам одного создания документа."""
+
+    save_to: str = ""
+    tickets: int = 0
+    cached: bool = False
+    phases: dict[str, PhaseTiming] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.perf_counter)
+    total: float = 0.0
+
+    def add(self, phase: str, seconds: float, count: int = 1) -> None:
+        timing = self.phases.get(phase)
+        if timing is None:
+            timing = self.phases[phase] = PhaseTiming()
+        timing.seconds += seconds
+        timing.count += count
+
+    @contextlib.contextmanager
+    def phase(self, name: str, count: int = 1) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, count)
+
+    def finish(self) -> None:
+        self.total = time.perf_counter() - self.started_at
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "save_to": self.save_to,
+            "tickets": self.tickets,
+            "cached": self.cached,
+            "total": round(self.total, 6),
+            "phases": {
+                name: {"seconds": round(timing.seconds, 6), "count": timing.count}
+                for name, timing in self.phases.items()
+            },
+        }
+
+    def log(self) -> None:
+        """Пишет замеры в лог строкой JSON"""
+        logging.info(
+            f"Generation timings: {json.dumps(self.as_dict(), ensure_ascii=False)}"
+        )
@@ -1,5 +1,13 @@
 from enum import Enum
-from typing import Literal
+from typing import Callable, Final, Literal
+
+# INFO: задание добавлено в очередь GenerationRunner, билетов ещё нет
+PHASE_QUEUED: Final[str] = "queued"
+PHASE_RENDER: Final[str] = "render"
+PHASE_SAVE: Final[str] = "save"
+
+# INFO: (этап, готово билетов, всего билетов), может прервать запись исключением
+RenderProgress = Callable[[str, int, int], None]
 
 
 class QuestionType(Enum):
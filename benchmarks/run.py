@@ -0,0 +1,354 @@
+"""
+Замеры скорости импорта, чтения бд и создания билетов на синтетических данных.
+
+Каждый замер выполняется в отдельном процессе, чтобы пиковая память (RSS)
+относилась только к нему. Запуск из корня репозитория:
+
+    python -m benchmarks.run --save benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+
+С --baseline замеры сравниваются с сохранёнными, при замедлении больше
+--tolerance код возврата 1.
+"""
+
+import argparse
+import datetime as dt
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from multiprocessing import get_context
+from typing import Any, Callable, Final
+
+from app_logic.processing.data import (
+    SqliteData,
+    TextProcessing,
+    docx_iter_questions,
+)
+from app_logic.processing.docx import Processing, format_ticket_date
+from app_logic.processing.repository import QuestionRepository
+from app_logic.types import QuestionType
+
+BANK_SIZES: Final[tuple[int, ...]] = (100, 1_000, 10_000, 100_000)
+TICKET_COUNTS: Final[tuple[int, ...]] = (1, 50, 500, 5_000)
+DOCX_SIZES: Final[tuple[int, ...]] = (100, 1_000, 10_000)
+# INFO: размеры банка вопросов для замеров создания билетов
+TICKETS_BANK_SIZE: Final[int] = 10_000
+DOCX_BANK_SIZE: Final[int] = 1_000
+
+SEED: Final[int] = 1
+WORDS: Final[tuple[str, ...]] = (
+    "база", "данных", "запрос", "таблица", "индекс", "ключ", "связь", "поле",
+    "модель", "функция", "процедура", "триггер", "транзакция", "схема",
+    "нормализация", "представление", "объясните", "опишите", "приведите",
+    "пример", "назначение", "виды", "принцип", "работы", "ошибки", "сети",
+)  # fmt: skip
+
+# INFO: замедление меньше этого не считается, это шум таймера
+MIN_DELTA_SECONDS: Final[float] = 0.005
+
+Phases = dict[str, float]
+
+
+@dataclass
+class CaseResult:
+    wall: float = 0.0
+    peak_rss_kib: int | None = None
+    phases: Phases = field(default_factory=dict)
+    error: str | None = None
+
+
+class PhaseTimer:
+    """Складывает время этапов замера."""
+
+    def __init__(self) -> None:
+        self.phases: Phases = {}
+
+    def __call__(self, name: str) -> "PhaseTimer":
+        self._name = name
+        return self
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc: object) -> None:
+        elapsed = time.perf_counter() - self._start
+        self.phases[self._name] = self.phases.get(self._name, 0.0) + elapsed
+
+
+def make_questions(count: int, salt: int = 0) -> list[str]:
+    rnd = random.Random(SEED + salt)
+    return [
+        f"Вопрос {i + 1}: {' '.join(rnd.choices(WORDS, k=rnd.randint(6, 20)))}"
+        for i in range(count)
+    ]
+
+
+def make_bank(workdir: str, count: int) -> SqliteData:
+    """Бд с count практическими и count теоретическими вопросами"""
+    sqlite = SqliteData(os.path.join(workdir, "bench.db"))
+    sqlite.add_list(make_questions(count, 1), QuestionType.PRACTICAL)
+    sqlite.add_list(make_questions(count, 2), QuestionType.THEORETICAL)
+    return sqlite
+
+
+def make_docx(path: str, questions: list[str]) -> None:
+    """Минимальный .docx с автоматическим нумерованным списком"""
+    w = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    paragraphs = "".join(
+        f'<w:p><w:pPr><w:numPr><w:ilvl w:val="0"/><w:numId w:val="1"/>'
+        f"</w:numPr></w:pPr><w:r><w:t>{question}</w:t></w:r></w:p>"
+        for question in questions
+    )
+    numbering = (
+        f'<w:numbering xmlns:w="{w}"><w:abstractNum w:abstractNumId="0">'
+        f'<w:lvl w:ilvl="0"><w:numFmt w:val="decimal"/></w:lvl></w:abstractNum>'
+        f'<w:num w:numId="1"><w:abstractNumId w:val="0"/></w:num></w:numbering>'
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(
+            "word/document.xml",
+            f'<w:document xmlns:w="{w}"><w:body>{paragraphs}</w:body></w:document>',
+        )
+        archive.writestr("word/numbering.xml", numbering)
+
+
+def bench_sqlite(workdir: str, timer: PhaseTimer, rows: int) -> None:
+    with timer("insert"):
+        sqlite = make_bank(workdir, rows // 2)
+    with timer("read_list"):
+        sqlite.read_questions_list(QuestionType.PRACTICAL)
+    with timer("read_dict"):
+        sqlite.read_questions_dict(QuestionType.THEORETICAL)
+    with timer("search"):
+        sqlite.search_questions("транзакция")
+
+
+def bench_text_import(workdir: str, timer: PhaseTimer, rows: int) -> None:
+    path = os.path.join(workdir, "questions.txt")
+    with timer("generate"):
+        with open(path, "w", encoding="utf-8") as file:
+            for i, question in enumerate(make_questions(rows), start=1):
+                file.write(f"{i}) {question}\n")
+    with timer("parse"):
+        TextProcessing().get_dict(path)
+
+
+def bench_docx_import(workdir: str, timer: PhaseTimer, rows: int) -> None:
+    path = os.path.join(workdir, "questions.docx")
+    with timer("generate"):
+        make_docx(path, make_questions(rows))
+    with timer("parse"):
+        for _ in docx_iter_questions(path):
+            pass
+
+
+def bench_replace_questions(workdir: str, timer: PhaseTimer, tickets: int) -> None:
+    with timer("bank"):
+        sqlite = make_bank(workdir, TICKETS_BANK_SIZE)
+    processing = Processing(QuestionRepository(sqlite))
+    with timer("questions_import"):
+        processing.questions_import()
+    processing.random.seed(SEED)
+    with timer("replace_questions"):
+        for _ in processing.replace_questions("always", "fallback", range(tickets)):
+            pass
+
+
+def generate(workdir: str, processing: Processing, tickets: int) -> None:
+    processing.process_docx(
+        save_to=os.path.join(workdir, "tickets.docx"),
+        subject="Базы данных",
+        spec="09.02.07",
+        cmk="Иванова И.И.",
+        tutor="Петров П.П.",
+        date=format_ticket_date(dt.date(2025, 6, 20)),
+        tickets_count=tickets,
+        qualify_status=False,
+        tickets_count_type="Manual",
+        theoretical_rnd_type="always",
+        practical_rnd_type="fallback",
+        seed=SEED,
+    )
+
+
+def bench_process_docx(workdir: str, timer: PhaseTimer, tickets: int) -> None:
+    with timer("bank"):
+        sqlite = make_bank(workdir, DOCX_BANK_SIZE)
+    processing = Processing(QuestionRepository(sqlite))
+    processing.output_cache = None
+    with timer("process_docx"):
+        generate(workdir, processing, tickets)
+    if processing.timings is not None:
+        for name, timing in processing.timings.phases.items():
+            timer.phases[f"process_docx.{name}"] = timing.seconds
+
+
+def bench_process_docx_warm(workdir: str, timer: PhaseTimer, tickets: int) -> None:
+    """Повторное создание в том же процессе, шаблон уже разобран"""
+    with timer("bank"):
+        sqlite = make_bank(workdir, DOCX_BANK_SIZE)
+    processing = Processing(QuestionRepository(sqlite))
+    processing.output_cache = None
+    with timer("warmup"):
+        generate(workdir, processing, tickets)
+    with timer("process_docx"):
+        generate(workdir, processing, tickets)
+    if processing.timings is not None:
+        for name, timing in processing.timings.phases.items():
+            timer.phases[f"process_docx.{name}"] = timing.seconds
+
+
+def cases(quick: bool) -> dict[str, tuple[Callable[..., None], int]]:
+    banks = BANK_SIZES[:-1] if quick else BANK_SIZES
+    tickets = TICKET_COUNTS[:-1] if quick else TICKET_COUNTS
+    docx_sizes = DOCX_SIZES[:-1] if quick else DOCX_SIZES
+
+    result: dict[str, tuple[Callable[..., None], int]] = {}
+    for rows in banks:
+        result[f"sqlite/{rows}"] = (bench_sqlite, rows)
+        result[f"text_import/{rows}"] = (bench_text_import, rows)
+    for rows in docx_sizes:
+        result[f"docx_import/{rows}"] = (bench_docx_import, rows)
+    for count in tickets:
+        result[f"replace_questions/{count}"] = (bench_replace_questions, count)
+        result[f"process_docx/{count}"] = (bench_process_docx, count)
+        result[f"process_docx_warm/{count}"] = (bench_process_docx_warm, count)
+    return result
+
+
+def peak_rss_kib() -> int | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # INFO: на macOS ru_maxrss в байтах, на Linux в килобайтах
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_case(func: Callable[..., None], arg: int) -> CaseResult:
+    """Выполняет замер в процессе пула"""
+    timer = PhaseTimer()
+    result = CaseResult()
+
+    with tempfile.TemporaryDirectory(prefix="doctemplater-bench-") as workdir:
+        start = time.perf_counter()
+        try:
+            func(workdir, timer, arg)
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+        result.wall = time.perf_counter() - start
+        SqliteData(os.path.join(workdir, "bench.db")).close()
+
+    result.phases = timer.phases
+    result.peak_rss_kib = peak_rss_kib()
+    return result
+
+
+def run(selected: dict[str, tuple[Callable[..., None], int]], repeat: int):
+    results: dict[str, CaseResult] = {}
+    # INFO: spawn -- чистый процесс на каждый замер, RSS не копится
+    context = get_context("spawn")
+
+    for name, (func, arg) in selected.items():
+        best: CaseResult | None = None
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(run_case, func, arg).result()
+            if best is None or (result.error is None and result.wall < best.wall):
+                best = result
+
+        assert best is not None
+        results[name] = best
+        if best.error:
+            logging.warning(f"{name:<24} FAILED {best.error}")
+            continue
+        phases = ", ".join(f"{k} {v:.3f}s" for k, v in best.phases.items())
+        logging.info(
+            f"{name:<24} {best.wall:8.3f}s  {best.peak_rss_kib or 0:>8} KiB  {phases}"
+        )
+    return results
+
+
+def compare(
+    results: dict[str, CaseResult], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Возвращает описания замедлений относительно baseline"""
+    regressions: list[str] = []
+
+    for name, result in results.items():
+        base = baseline.get("cases", {}).get(name)
+        if result.error or not base or base.get("error"):
+            continue
+
+        measured = {"wall": result.wall, **result.phases}
+        expected = {"wall": base["wall"], **base.get("phases", {})}
+        for key, value in measured.items():
+            old = expected.get(key)
+            if old is None:
+                continue
+            if value > old * (1 + tolerance) and value - old > MIN_DELTA_SECONDS:
+                regressions.append(
+                    f"{name} {key}: {old:.3f}s -> {value:.3f}s "
+                    f"(+{(value / old - 1) * 100 if old else 100:.0f}%)"
+                )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Замеры скорости DocTemplater")
+    parser.add_argument("--quick", action="store_true", help="без самых больших")
+    parser.add_argument("--filter", default="", help="только замеры с подстрокой")
+    parser.add_argument("--repeat", type=int, default=1, help="лучший из N")
+    parser.add_argument("--save", help="записать результаты в JSON")
+    parser.add_argument("--baseline", help="сравнить с JSON прошлых замеров")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    selected = {
+        name: case for name, case in cases(args.quick).items() if args.filter in name
+    }
+    results = run(selected, max(1, args.repeat))
+
+    if args.save:
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "cases": {name: asdict(result) for name, result in results.items()},
+        }
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        logging.info(f"Saved {args.save}")
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        logging.warning(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
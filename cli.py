@@ -0,0 +1,177 @@
+"""
+Создание билетов без интерфейса по файлу заданий (.json или .csv).
+
+Пример задания в JSON (список заданий или {"jobs": [...]}):
+
+    {
+        "output": "out/Билеты ИС.docx",
+        "subject": "Базы данных",
+        "spec": "09.02.07",
+        "cmk": "Иванова И.И.",
+        "tutor": "Петров П.П.",
+        "date": "2025-06-20",
+        "tickets_count": 30,
+        "tickets_count_type": "Manual",
+        "practical_rnd_type": "fallback",
+        "theoretical_rnd_type": "always",
+        "qualify": false,
+        "seed": 42,
+        "layout": "base"
+    }
+
+В CSV те же поля в заголовке. Запуск:
+
+    python cli.py jobs.json --jobs 4
+"""
+
+import argparse
+import csv
+import datetime as dt
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Final
+
+from app_logic.processing.docx import (
+    DocxProcessingError,
+    Processing,
+    format_ticket_date,
+)
+
+TICKETS_COUNT_TYPES: Final[tuple[str, ...]] = ("Manual", "Practical", "Theoretical")
+RND_TYPES: Final[tuple[str, ...]] = ("fallback", "always", "none")
+TRUE_VALUES: Final[tuple[str, ...]] = ("1", "true", "yes", "да")
+
+
+class ManifestError(Exception):
+    pass
+
+
+def parse_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_VALUES
+    return bool(value)
+
+
+def parse_optional_int(value: Any) -> int | None:
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def load_manifest(path: str) -> list[dict[str, Any]]:
+    """Читает задания из .json или .csv"""
+    if path.lower().endswith(".csv"):
+        with open(path, "r", encoding="utf-8-sig", newline="") as file:
+            return list(csv.DictReader(file))
+
+    with open(path, "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+
+    if isinstance(manifest, dict):
+        manifest = manifest.get("jobs", [manifest])
+    if not isinstance(manifest, list):
+        raise ManifestError("Ожидается список заданий")
+    return manifest
+
+
+def job_params(job: dict[str, Any], base_dir: str) -> dict[str, Any]:
+    """Переводит задание из файла в аргументы Processing.process_docx"""
+    output = job.get("output")
+    if not output:
+        raise ManifestError("Не указан output")
+    if not os.path.isabs(output):
+        output = os.path.join(base_dir, output)
+    if not output.lower().endswith(".docx"):
+        output = f"{output}.docx"
+
+    tickets_count_type = job.get("tickets_count_type") or "Manual"
+    if tickets_count_type not in TICKETS_COUNT_TYPES:
+        raise ManifestError(f"Неизвестный tickets_count_type: {tickets_count_type}")
+
+    params: dict[str, Any] = {
+        "save_to": output,
+        "tickets_count_type": tickets_count_type,
+    }
+    for key in ("practical_rnd_type", "theoretical_rnd_type"):
+        params[key] = job.get(key) or "fallback"
+        if params[key] not in RND_TYPES:
+            raise ManifestError(f"Неизвестный {key}: {params[key]}")
+
+    date = job.get("date")
+    params["date"] = format_ticket_date(
+        dt.date.fromisoformat(date) if date else dt.date.today()
+    )
+
+    for key in ("subject", "spec", "cmk", "tutor"):
+        params[key] = str(job.get(key) or "")
+    params["qualify_status"] = parse_bool(job.get("qualify", False))
+    params["tickets_count"] = parse_optional_int(job.get("tickets_count"))
+    params["seed"] = parse_optional_int(job.get("seed"))
+    params["layout"] = job.get("layout") or None
+    return params
+
+
+def run_job(params: dict[str, Any]) -> tuple[float, int]:
+    """Создаёт один документ, выполняется в процессе пула"""
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(params["save_to"]) or ".", exist_ok=True)
+    seed = Processing().process_docx(**params)
+    return time.perf_counter() - start, seed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Создание билетов промежуточной аттестации без интерфейса"
+    )
+    parser.add_argument("manifest", help="файл заданий .json или .csv")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="сколько документов создавать параллельно",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    base_dir = os.path.dirname(os.path.abspath(args.manifest))
+    try:
+        jobs = [job_params(job, base_dir) for job in load_manifest(args.manifest)]
+    except (OSError, ValueError, ManifestError) as error:
+        logging.error(f"Invalid manifest {args.manifest}: {error}")
+        return 2
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(jobs)))) as pool:
+        futures = {pool.submit(run_job, params): params for params in jobs}
+        for future in as_completed(futures):
+            save_to = futures[future]["save_to"]
+            try:
+                seconds, seed = future.result()
+            except DocxProcessingError as error:
+                failed += 1
+                logging.error(f"FAILED {save_to}: {error}")
+                continue
+            except Exception:
+                failed += 1
+                logging.exception(f"FAILED {save_to}")
+                continue
+            logging.info(f"OK {save_to} in {seconds:.2f}s, seed {seed}")
+
+    logging.info(f"Done: {len(jobs) - failed} ok, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1,7 +1,16 @@
+import time
+
+# INFO: время запуска отсчитывается до импорта flet и вкладок
+STARTED_AT = time.perf_counter()
+
+import locale
+import multiprocessing
 import flet as ft
 from ui.tabs.edit_document import TabEditDocument
-from ui.tabs.edit_questions import TabEditQuestions
+from ui.tabs.edit_questions import EditQuestionsTabController, TabEditQuestions
 from app_logic import MainUi
+from app_logic.processing.docx import prewarm_processing
+from ui.profiling import install_profiler, profiling_enabled
 import logging
 
 logging.basicConfig(
@@ -51,7 +60,12 @@ class DocTemplater(MainUi):
         return tabs
 
 
+IMPORTED_AT = time.perf_counter()
+
+
 def main(page: ft.Page):
+    locale.setlocale(locale.LC_ALL, "")
+
     page.title = "DocTemplater"
     page.window.icon = "Logo.ico"
     page.padding = 0
@@ -64,10 +78,26 @@ def main(page: ft.Page):
         current_locale=ft.Locale("ru"),
     )
 
+    if profiling_enabled():
+        # INFO: классы оборачиваются до создания вкладок
+        install_profiler(
+            page,
+            [MainUi, TabEditDocument, EditQuestionsTabController, TabEditQuestions],
+        )
+
     doc_templater = DocTemplater(page)
     app = doc_templater.init_ui()
     page.add(app)
 
+    logging.info(
+        f"Startup: imports {IMPORTED_AT - STARTED_AT:.3f}s, "
+        f"first frame {time.perf_counter() - STARTED_AT:.3f}s"
+    )
+    # INFO: библиотеки рендера грузятся после отрисовки окна, а не при запуске
+    prewarm_processing()
+
 
 if __name__ == "__main__":
+    # INFO: нужно для пула процессов рендера в собранном бинарнике
+    multiprocessing.freeze_support()
     ft.app(target=main, assets_dir="assets")
@@ -1,4 +1,3 @@
-import locale
 from typing import Callable, Optional
 from flet import (
     BorderSide,
@@ -22,8 +21,6 @@ import calendar
 from datetime import datetime, timedelta
 import datetime as dt
 
-locale.setlocale(locale.LC_ALL, "")
-
 
 # WARNING: Incomplete custom DatePicker widget
 # TODO: Implement from DATE to DATE
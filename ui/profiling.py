@@ -0,0 +1,202 @@
+"""
+Профилирование обработчиков событий интерфейса.
+
+Включается переменной окружения DOCTEMPLATER_PROFILE=1. Обработчики
+контроллеров вкладок (on_*, toggle_*) оборачиваются замером времени,
+page.update() -- подсчётом вызовов и размера отправляемых деревьев.
+По завершении сессии в папку данных приложения пишутся profile.prof
+(cProfile, открывается pstats/snakeviz) и summary.txt.
+"""
+
+import atexit
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Final, Iterable
+
+import flet as ft
+from platformdirs import user_data_dir
+
+from app_logic.processing.data import APP_AUTHOR, APP_NAME
+
+PROFILE_ENV: Final[str] = "DOCTEMPLATER_PROFILE"
+PROFILES_DIR: Final[str] = "profiles"
+HANDLER_PREFIXES: Final[tuple[str, ...]] = ("on_", "toggle_")
+# INFO: обновления вне обёрнутых обработчиков (фоновые потоки, вложенные колбэки)
+UNATTRIBUTED: Final[str] = "<unattributed>"
+REPORT_TOP_FUNCTIONS: Final[int] = 40
+PROFILE_THREADS_NOTE: Final[str] = (
+    "Note: cProfile records every thread while a handler is profiled, so\n"
+    "generation and import threads running at that time are included below.\n"
+)
+
+
+def profiling_enabled() -> bool:
+    return os.environ.get(PROFILE_ENV, "").lower() in ("1", "true", "yes")
+
+
+def count_controls(controls: Iterable[ft.Control]) -> int:
+    """Количество контролов в деревьях, включая вложенные"""
+    stack = list(controls)
+    count = 0
+    while stack:
+        control = stack.pop()
+        count += 1
+        stack.extend(control._get_children())
+    return count
+
+
+@dataclass
+class HandlerStats:
+    calls: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    updates: int = 0
+    controls: int = 0
+
+
+class UiProfiler:
+    """
+    Сбор замеров обработчиков за сессию.
+
+    С Python 3.12 cProfile работает через sys.monitoring: включённый профиль
+    записывает все потоки процесса, а второй enable() в другом потоке
+    падает. Поэтому обработчик, начавшийся во время профилирования другого,
+    замеряется только по времени, а в profile.prof могут попасть потоки
+    генерации и импорта, работавшие в это время. Фильтра по потоку у
+    sys.monitoring нет, об этом предупреждает summary.txt.
+    """
+
+    def __init__(self) -> None:
+        self.stats: dict[str, HandlerStats] = {}
+        self.started_at = time.localtime()
+
+        self._profile = cProfile.Profile()
+        self._profile_busy = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _record(self, name: str) -> HandlerStats:
+        with self._lock:
+            return self.stats.setdefault(name, HandlerStats())
+
+    def wrap_handler(self, name: str, handler: Callable[..., Any]):
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            # INFO: вложенный обработчик учитывается во внешнем
+            if getattr(self._local, "current", None) is not None:
+                return handler(*args, **kwargs)
+
+            stats = self._record(name)
+            with self._lock:
+                profiling = not self._profile_busy
+                self._profile_busy = True
+
+            self._local.current = stats
+            start = time.perf_counter()
+            if profiling:
+                self._profile.enable()
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                if profiling:
+                    self._profile.disable()
+                elapsed = time.perf_counter() - start
+                self._local.current = None
+
+                with self._lock:
+                    if profiling:
+                        self._profile_busy = False
+                    stats.calls += 1
+                    stats.seconds += elapsed
+                    stats.max_seconds = max(stats.max_seconds, elapsed)
+
+        wrapper.__profiled__ = True  # type: ignore[attr-defined]
+        return wrapper
+
+    def wrap_classes(self, classes: Iterable[type]) -> None:
+        """Оборачивает обработчики классов, до создания их экземпляров"""
+        for cls in classes:
+            for attr, value in list(vars(cls).items()):
+                if (
+                    callable(value)
+                    and attr.startswith(HANDLER_PREFIXES)
+                    and not getattr(value, "__profiled__", False)
+                ):
+                    setattr(
+                        cls, attr, self.wrap_handler(f"{cls.__name__}.{attr}", value)
+                    )
+
+    def attach(self, page: ft.Page) -> None:
+        """Считает вызовы page.update() и размер отправляемых деревьев"""
+        update = page.update
+
+        def counted_update(*controls: ft.Control) -> None:
+            size = count_controls(controls or page.controls or [])
+            stats = getattr(self._local, "current", None) or self._record(UNATTRIBUTED)
+            with self._lock:
+                stats.updates += 1
+                stats.controls += size
+            update(*controls)
+
+        page.update = counted_update  # type: ignore[method-assign]
+
+    def summary(self) -> str:
+        rows = sorted(self.stats.items(), key=lambda item: -item[1].seconds)
+        lines = [
+            f"{'handler':<56} {'calls':>6} {'total s':>9} {'mean ms':>9} "
+            f"{'max ms':>9} {'updates':>8} {'controls':>9}"
+        ]
+        for name, stats in rows:
+            mean = stats.seconds / stats.calls * 1000 if stats.calls else 0.0
+            lines.append(
+                f"{name:<56} {stats.calls:>6} {stats.seconds:>9.3f} {mean:>9.1f} "
+                f"{stats.max_seconds * 1000:>9.1f} {stats.updates:>8} "
+                f"{stats.controls:>9}"
+            )
+        return "\n".join(lines)
+
+    def write_report(self, directory: str | None = None) -> str:
+        """Пишет profile.prof и summary.txt, возвращает папку отчёта"""
+        directory = directory or os.path.join(
+            user_data_dir(APP_NAME, APP_AUTHOR),
+            PROFILES_DIR,
+            time.strftime("session-%Y%m%d-%H%M%S", self.started_at),
+        )
+        os.makedirs(directory, exist_ok=True)
+
+        with self._lock:
+            summary = self.summary()
+            top = io.StringIO()
+            self._profile.create_stats()
+            if self._profile.stats:  # type: ignore[attr-defined]
+                self._profile.dump_stats(os.path.join(directory, "profile.prof"))
+                stats = pstats.Stats(self._profile, stream=top)
+                stats.sort_stats(pstats.SortKey.CUMULATIVE)
+                stats.print_stats(REPORT_TOP_FUNCTIONS)
+
+        with open(os.path.join(directory, "summary.txt"), "w", encoding="utf-8") as f:
+            f.write(summary)
+            f.write("\n\n")
+            if top.getvalue():
+                f.write(PROFILE_THREADS_NOTE)
+            f.write(top.getvalue())
+
+        logging.info(f"UI profile written to {directory}")
+        return directory
+
+
+def install_profiler(page: ft.Page, classes: Iterable[type]) -> UiProfiler:
+    """Включает профилирование сессии, отчёт пишется при выходе"""
+    profiler = UiProfiler()
+    profiler.wrap_classes(classes)
+    profiler.attach(page)
+    atexit.register(profiler.write_report)
+    logging.info("UI profiling enabled")
+    return profiler
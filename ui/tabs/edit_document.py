@@ -1,12 +1,20 @@
 import datetime as dt
 import logging
+import os
+import time
+from typing import Final
 
 import flet as ft
 from anyio import Path
 
 from app_logic import MainUi
-from app_logic.processing.docx import DocxProcessingError, Processing
-from app_logic.types import QuestionType
+from app_logic.processing.docx import (
+    DocxProcessingError,
+    Processing,
+    format_ticket_date,
+)
+from app_logic.processing.jobs import GenerationJob, GenerationRunner
+from app_logic.types import PHASE_QUEUED, PHASE_SAVE, QuestionType
 from app_logic.ui import open_file
 from ui.templates import (
     DateRow,
@@ -18,15 +26,17 @@ from ui.templates import (
     WarnPopup,
 )
 from config import config
-import locale
 
-locale.setlocale(locale.LC_ALL, "")
+# INFO: как часто обновлять прогресс создания документа, в секундах
+GENERATION_PROGRESS_INTERVAL: Final[float] = 0.1
 
 
 class TabEditDocument(MainUi):
     def __init__(self, page: ft.Page, tab_label: ft.Text) -> None:
         self.tab_label = tab_label
         self.docx_processing = Processing()
+        self.generation = GenerationRunner(self.docx_processing)
+        self.progress_updated_at = 0.0
         self.page = page
 
         self.textfield_subject = StyledTextField(
@@ -79,6 +89,29 @@ class TabEditDocument(MainUi):
         )
         self.button_clear = StyledButton(text="Очистить поля")
 
+        self.text_generation = ft.Text()
+        self.progress_generation = ft.ProgressBar(expand=True)
+        self.button_cancel_generation = StyledButton(
+            text="Отменить",
+            on_click=lambda e: self.generation.cancel_all(),
+        )
+        self.panel_generation = ft.Container(
+            visible=False,
+            margin=ft.margin.only(left=9, top=0, right=9, bottom=9),
+            content=ft.Column(
+                spacing=6,
+                controls=[
+                    self.text_generation,
+                    ft.Row(
+                        controls=[
+                            self.progress_generation,
+                            self.button_cancel_generation,
+                        ]
+                    ),
+                ],
+            ),
+        )
+
         self.segmented_button_ticket_num = StyledSegmentedButton(
             selected={"Manual"}, expand=True
         )
@@ -94,24 +127,7 @@ class TabEditDocument(MainUi):
         pass
 
     def on_change_date_picker(self, e):
-        MONTHS_RU_GEN = [
-            "",
-            "января",
-            "февраля",
-            "марта",
-            "апреля",
-            "мая",
-            "июня",
-            "июля",
-            "августа",
-            "сентября",
-            "октября",
-            "ноября",
-            "декабря",
-        ]
-        date = e.control.value
-
-        formatted = f"{date.year}.{MONTHS_RU_GEN[date.month]}.{date.day}".split(".")
+        formatted = format_ticket_date(e.control.value)
         logging.info(formatted)
 
         self.date_row.value = formatted
@@ -167,9 +183,10 @@ class TabEditDocument(MainUi):
         self.button_submit.update()
 
     def on_pick(self, e: ft.FilePickerResultEvent, overlay: ft.Container):
+        overlay.visible = False
+        self.page.update()
+
         if not e.path:
-            overlay.visible = False
-            self.page.update()
             logging.info(f"Save path is None: {e.path}")
             return
 
@@ -177,22 +194,6 @@ class TabEditDocument(MainUi):
         if filepath[-5:].lower() != ".docx":
             filepath = f"{filepath}.docx"
 
-        text = ft.Text(
-            "Документ создается...",
-            size=32,
-            weight=ft.FontWeight.BOLD,
-            text_align=ft.TextAlign.CENTER,
-        )
-        loading_ui = ft.Column(
-            alignment=ft.MainAxisAlignment.CENTER,
-            horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-        )
-        loading_ui.controls = [text, ft.ProgressRing()]
-
-        overlay.content = loading_ui
-        overlay.visible = True
-        self.page.update()
-
         if (
             not self.segmented_btn_theoretical.selected
             or not self.segmented_btn_practical.selected
@@ -208,8 +209,9 @@ class TabEditDocument(MainUi):
         if self.textfield_ticket_number.value:
             tickets_count = int(self.textfield_ticket_number.value)
 
-        try:
-            response = self.docx_processing.process_docx(
+        # INFO: документ создаётся в фоне, интерфейс остаётся доступным
+        self.generation.submit(
+            params=dict(
                 save_to=filepath,
                 subject=(self.textfield_subject.value or ""),
                 spec=(self.textfield_spec.value or ""),
@@ -221,28 +223,56 @@ class TabEditDocument(MainUi):
                 tickets_count_type=tickets_count_type,
                 practical_rnd_type=practical_rnd_type,
                 theoretical_rnd_type=theoretical_rnd_type,
-            )
-        except DocxProcessingError as error:
-            logging.info(f"Error processing docx: {error}'")
-            overlay.visible = False
-            overlay.update()
-            overlay.content = Overlay().content
+                workers=os.cpu_count() or 1,
+            ),
+            on_progress=self.on_generation_progress,
+            on_done=self.on_generation_done,
+        )
 
-            self.page.open(WarnPopup(error))
-            return
+    def show_generation_progress(self, text: str, value: float | None):
+        queued = self.generation.pending - 1
+        if queued > 0:
+            text = f"{text} (в очереди: {queued})"
 
-        self.handle_generation_complete(filepath)
-        overlay.visible = False
-        overlay.update()
-        overlay.content = Overlay().content
+        self.text_generation.value = text
+        self.progress_generation.value = value
+        self.panel_generation.visible = True
+        self.panel_generation.update()
 
-        if not response:
+    def on_generation_progress(
+        self, job: GenerationJob, phase: str, done: int, total: int
+    ):
+        # INFO: не чаще раза в GENERATION_PROGRESS_INTERVAL секунд, кроме конца
+        now = time.monotonic()
+        if done < total and now - self.progress_updated_at < (
+            GENERATION_PROGRESS_INTERVAL
+        ):
             return
+        self.progress_updated_at = now
 
-        self.page.run_thread(
-            lambda: self.docx_processing.clean(path=response[0], paths=response[1])
+        if phase == PHASE_QUEUED:
+            self.show_generation_progress("Документ в очереди...", None)
+            return
+        if phase == PHASE_SAVE:
+            self.show_generation_progress("Сохранение документа...", None)
+            return
+        self.show_generation_progress(
+            f"Создано билетов: {done} из {total}", done / total if total else None
         )
 
+    def on_generation_done(self, job: GenerationJob, error: Exception | None):
+        if self.generation.pending == 0:
+            self.panel_generation.visible = False
+            self.panel_generation.update()
+
+        if error is None:
+            self.handle_generation_complete(job.save_to)
+        elif isinstance(error, DocxProcessingError):
+            logging.info(f"Error processing docx: {error}'")
+            self.page.open(WarnPopup(error))
+        else:
+            self.page.open(WarnPopup("Не удалось создать документ"))
+
     def handle_generation_complete(self, filepath: str):
         dialog = StyledAlertDialog(
             title=ft.Text("Документ создан", text_align=ft.TextAlign.CENTER),
@@ -439,6 +469,10 @@ class TabEditDocument(MainUi):
         tab.content = ft.Column(
             expand=True,
             spacing=0,
-            controls=[ft.Container(tab_listview, expand=1, padding=9), tab_buttons],
+            controls=[
+                ft.Container(tab_listview, expand=1, padding=9),
+                self.panel_generation,
+                tab_buttons,
+            ],
         )
         return tab
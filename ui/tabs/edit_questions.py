@@ -1,16 +1,21 @@
+import itertools
 import logging
-from typing import Any
+import os
+from typing import Any, Final
 
 import flet as ft
 
 from app_logic.table import get_selected_row_questions
 from app_logic.processing.data import (
-    SqliteData,
     TextProcessing,
     clean_question_by_regex,
-    docx_extract_questions,
 )
-from app_logic.processing.docx import Processing
+from app_logic.processing.importer import (
+    BatchImporter,
+    FileImportResult,
+    collect_import_files,
+)
+from app_logic.processing.repository import QuestionChange, get_question_repository
 from app_logic.types import QuestionType
 from ui.templates import (
     Overlay,
@@ -21,8 +26,27 @@ from ui.templates import (
     WarnPopup,
 )
 
+# INFO: строки таблицы создаются порциями по мере прокрутки
+ROWS_PAGE_SIZE: Final[int] = 100
+# INFO: больше строк в таблице не держится, при прокрутке окно строк сдвигается
+ROWS_WINDOW_SIZE: Final[int] = 300
+# INFO: высота строки фиксирована, по ней восстанавливается прокрутка при сдвиге
+ROW_HEIGHT: Final[int] = 48
+# INFO: за сколько пикселей до конца списка подгружать следующую порцию
+ROWS_LOAD_THRESHOLD: Final[int] = 400
+# INFO: сколько найденных вопросов показывать, об остальных пишется под поиском
+SEARCH_RESULTS_LIMIT: Final[int] = 200
+
 
 class EditQuestionsTabController:
+    # INFO: строки текущего окна таблиц по id вопроса, см. _build_data_rows
+    data_rows: dict[QuestionType, dict[int, ft.DataRow]]
+    # INFO: окно строк таблицы: первый показанный вопрос и количество строк
+    rows_start: dict[QuestionType, int]
+    rows_limit: dict[QuestionType, int]
+    # INFO: прокручиваемые списки с таблицами, создаются в get_tab_ui
+    list_views: dict[QuestionType, ft.ListView]
+
     def __init__(
         self,
         page: ft.Page,
@@ -32,14 +56,14 @@ class EditQuestionsTabController:
     ) -> None:
         self.page = page
         self.build_data_rows = _build_data_rows
-        self.doc_processing = Processing()
         self.text_processing = TextProcessing()
-        self.sqlite = SqliteData()
+        self.questions_repo = get_question_repository()
+        self.batch_importer = BatchImporter(self.questions_repo)
 
-        self.questions_practical = self.sqlite.read_questions_dict(
+        self.questions_practical = self.questions_repo.read_questions_dict(
             QuestionType.PRACTICAL
         )
-        self.questions_theoretical = self.sqlite.read_questions_dict(
+        self.questions_theoretical = self.questions_repo.read_questions_dict(
             QuestionType.THEORETICAL
         )
 
@@ -52,6 +76,81 @@ class EditQuestionsTabController:
 
         self.table_practical = table_practical
         self.table_theoretical = table_theoretical
+        self.search_query = ""
+        # INFO: найденные по search_query вопросы, сбрасываются при изменениях
+        self.search_results: dict[QuestionType, dict[int, Any]] = {}
+        # INFO: типы, у которых найдено больше SEARCH_RESULTS_LIMIT вопросов
+        self.search_capped: set[QuestionType] = set()
+
+        self.questions_repo.subscribe(self.on_questions_change)
+
+    def on_questions_change(self, change: QuestionChange):
+        """Обновляет таблицу типа, вопросы которого изменились"""
+        questions = (
+            self.questions_practical
+            if change.question_type == QuestionType.PRACTICAL
+            else self.questions_theoretical
+        )
+        self.refresh_table(questions, change.question_type)
+
+    def search(self, question_type: QuestionType) -> dict[int, Any]:
+        """Ищет вопросы типа по search_query"""
+        # INFO: лишний вопрос запрашивается, чтобы узнать, что показаны не все
+        found = self.questions_repo.search_questions(
+            self.search_query, question_type, SEARCH_RESULTS_LIMIT + 1
+        )
+        if len(found) > SEARCH_RESULTS_LIMIT:
+            self.search_capped.add(question_type)
+        else:
+            self.search_capped.discard(question_type)
+        return dict(itertools.islice(found.items(), SEARCH_RESULTS_LIMIT))
+
+    def visible_questions(self, question_type: QuestionType) -> dict[int, Any]:
+        """Возвращает вопросы для таблицы с учётом строки поиска"""
+        if self.search_query:
+            found = self.search_results.get(question_type)
+            if found is None:
+                found = self.search_results[question_type] = self.search(question_type)
+            return found
+        if question_type == QuestionType.PRACTICAL:
+            return self.questions_practical
+        return self.questions_theoretical
+
+    def reset_rows(self, question_type: QuestionType, table: ft.DataTable):
+        """Показывает таблицу с первой строки, когда меняется набор вопросов"""
+        self.rows_start[question_type] = 0
+        self.rows_limit[question_type] = ROWS_PAGE_SIZE
+        table.rows = self.build_data_rows(
+            self.visible_questions(question_type), question_type
+        )
+        table.update()
+
+        list_view = self.list_views.get(question_type)
+        if list_view is not None:
+            list_view.scroll_to(offset=0, duration=0)
+
+    def on_change_search(self, e: ft.ControlEvent):
+        self.search_query = (e.control.value or "").strip()
+        self.search_results.clear()
+
+        for question_type, table in (
+            (QuestionType.PRACTICAL, self.table_practical),
+            (QuestionType.THEORETICAL, self.table_theoretical),
+        ):
+            self.reset_rows(question_type, table)
+        self.update_search_hint()
+
+    def update_search_hint(self):
+        """Пишет под поиском, если найденные вопросы показаны не все"""
+        hint = None
+        if self.search_query and self.search_capped:
+            hint = (
+                f"Показаны {SEARCH_RESULTS_LIMIT} наиболее подходящих вопросов, "
+                "уточните запрос"
+            )
+        if self.textfield_search.helper_text != hint:
+            self.textfield_search.helper_text = hint
+            self.textfield_search.update()
 
     def refresh_table(
         self,
@@ -70,13 +169,13 @@ class EditQuestionsTabController:
 
         if refresh_questions:
             questions.clear()
-            questions.update(self.sqlite.read_questions_dict(question_type))
+            questions.update(self.questions_repo.read_questions_dict(question_type))
 
         selected_rows.clear()
         selected_rows.update({idx: False for idx in questions.keys()})
-        table.rows = self.build_data_rows(questions, question_type)
-
-        table.update()
+        self.search_results.pop(question_type, None)
+        self.reset_rows(question_type, table)
+        self.update_search_hint()
         logging.info("Questions table refreshed")
 
     def toggle_row(
@@ -86,19 +185,53 @@ class EditQuestionsTabController:
         question_type: QuestionType,
     ) -> None:
         selected_rows[question_id] = not selected_rows[question_id]
-        questions = self.sqlite.read_questions_dict(question_type)
 
+        # INFO: обновляется только строка, а не вся таблица
+        row = self.data_rows[question_type][question_id]
+        row.selected = selected_rows[question_id]
+        row.update()
+
+    def on_scroll_table(self, e: ft.OnScrollEvent, question_type: QuestionType):
+        """
+        Сдвигает окно строк у краёв списка
+
+        Пока строк меньше ROWS_WINDOW_SIZE, у конца списка добавляется порция,
+        дальше окно сдвигается: сверху убирается столько строк, сколько
+        добавлено снизу, и наоборот при прокрутке вверх.
+        """
         if question_type == QuestionType.PRACTICAL:
             table = self.table_practical
         elif question_type == QuestionType.THEORETICAL:
             table = self.table_theoretical
 
+        questions = self.visible_questions(question_type)
+        start = self.rows_start[question_type]
+        limit = self.rows_limit[question_type]
+        offset = None
+
+        if e.max_scroll_extent - e.pixels <= ROWS_LOAD_THRESHOLD:
+            if start + limit >= len(questions):
+                return
+            if limit < ROWS_WINDOW_SIZE:
+                self.rows_limit[question_type] = limit + ROWS_PAGE_SIZE
+            else:
+                shift = min(ROWS_PAGE_SIZE, len(questions) - start - limit)
+                self.rows_start[question_type] = start + shift
+                offset = e.pixels - shift * ROW_HEIGHT
+        elif e.pixels <= ROWS_LOAD_THRESHOLD and start > 0:
+            shift = min(ROWS_PAGE_SIZE, start)
+            self.rows_start[question_type] = start - shift
+            offset = e.pixels + shift * ROW_HEIGHT
+        else:
+            return
+
         table.rows = self.build_data_rows(questions, question_type)
         table.update()
+        # INFO: те же строки остаются на экране после сдвига окна
+        if offset is not None:
+            self.list_views[question_type].scroll_to(offset=max(offset, 0), duration=0)
 
     def toggle_all(self, e, question_type: QuestionType):
-        questions = self.sqlite.read_questions_dict(question_type)
-
         if question_type == QuestionType.PRACTICAL:
             selected = self.selected_rows_practical
             table = self.table_practical
@@ -106,73 +239,161 @@ class EditQuestionsTabController:
             selected = self.selected_rows_theoretical
             table = self.table_theoretical
 
-        new_state = not any(selected.values())
+        # INFO: при поиске переключаются только найденные вопросы
+        questions = self.visible_questions(question_type)
+        new_state = not any(selected.get(idx) for idx in questions)
 
-        for idx in selected:
+        for idx in questions:
             selected[idx] = new_state
 
         table.rows = self.build_data_rows(questions, question_type)
         table.update()
 
     def on_pick(self, e: ft.FilePickerResultEvent, overlay: ft.Container):
-        overlay.visible = False
-
         def warning():
             self.page.open(
                 WarnPopup("Выберите документ (.docx) или текстовый файл (.txt)")
             )
 
-        if not e.files:
-            warning()
-            return
+        def hide_overlay():
+            overlay.visible = False
+            overlay.content = Overlay().content
+            overlay.update()
 
-        filepath = e.files[0].path
-        logging.info(filepath)
-
-        if filepath[-5:].lower() == ".docx":
-            new_questions = docx_extract_questions(filepath)
-        elif filepath[-4:].lower() == ".txt":
-            new_questions = self.text_processing.get_dict(filepath)
+        if e.files:
+            paths = [file.path for file in e.files if file.path]
+        elif e.path:
+            # INFO: выбрана папка через get_directory_path
+            paths = [e.path]
         else:
+            paths = []
+
+        files = collect_import_files(paths)
+        logging.info(files)
+        if not files:
+            hide_overlay()
             warning()
             return
 
-        if not new_questions:
-            self.page.open(WarnPopup("В файле нету вопросов"))
-            return
+        progress_text = ft.Text(
+            f"Обработано файлов: 0 из {len(files)}",
+            size=32,
+            weight=ft.FontWeight.BOLD,
+            text_align=ft.TextAlign.CENTER,
+        )
+        # INFO: время или ошибка последнего разобранного файла
+        file_text = ft.Text(size=16, text_align=ft.TextAlign.CENTER)
 
-        # TODO: Доработать ПОПАП
-        button_practical = StyledButton("Практические")
-        button_theoretical = StyledButton("Теоретические")
+        def show_overlay():
+            overlay.content = ft.Column(
+                alignment=ft.MainAxisAlignment.CENTER,
+                horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+                controls=[progress_text, file_text, ft.ProgressRing()],
+            )
+            overlay.visible = True
+            overlay.update()
 
-        button_practical.on_click = (
-            lambda e, qtype=QuestionType.PRACTICAL: on_click_save_to(e, qtype)
-        )
-        button_theoretical.on_click = (
-            lambda e, qtype=QuestionType.THEORETICAL: on_click_save_to(e, qtype)
-        )
+        show_overlay()
 
-        dialog_content = ft.Row(expand=True)
-        dialog_content.controls = [button_practical, button_theoretical]
-        dialog = ft.AlertDialog(
-            shape=ft.RoundedRectangleBorder(radius=9),
-            content_padding=ft.padding.all(14),
-            action_button_padding=0,
-            actions_padding=0,
-            title=ft.Text("Тип вопросов"),
-            content=ft.Container(content=dialog_content, padding=9),
-        )
-        self.page.open(dialog)
+        def on_progress(result: FileImportResult, done: int, total: int):
+            name = os.path.basename(result.path)
+            progress_text.value = f"Обработано файлов: {done} из {total}"
+            if result.error is not None:
+                file_text.value = f"{name}: ошибка, {result.error}"
+            else:
+                file_text.value = (
+                    f"{name}: вопросов {len(result.questions)} "
+                    f"за {result.seconds:.2f} с"
+                )
+            progress_text.update()
+            file_text.update()
 
-        def on_click_save_to(e, qtype):
-            button_practical.disabled = True
-            button_theoretical.disabled = True
-            button_practical.update()
-            button_theoretical.update()
+        def parse_files():
+            try:
+                results = self.batch_importer.parse(files, on_progress)
+            finally:
+                hide_overlay()
 
-            self.sqlite.add_list(new_questions, qtype)
-            self.refresh_table(self.sqlite.read_questions_dict(qtype), qtype)
-            self.page.close(dialog)
+            for result in results:
+                if result.error is not None:
+                    logging.error(f"Failed to import {result.path}: {result.error}")
+
+            if not any(result.questions for result in results):
+                self.page.open(WarnPopup("В файле нету вопросов"))
+                return
+            choose_question_type(results)
+
+        def save_questions(results: list[FileImportResult], qtype: QuestionType):
+            progress_text.value = "Сохранение вопросов..."
+            file_text.value = ""
+            show_overlay()
+            try:
+                # INFO: таблица обновится через on_questions_change
+                report = self.batch_importer.save(results, qtype)
+            finally:
+                hide_overlay()
+
+            message = (
+                f"Добавлено вопросов: {report.added}, "
+                f"повторов пропущено: {report.duplicates}"
+            )
+            if not report.failed:
+                self.page.open(WarnPopup(message))
+                return
+            show_failed(message, report.failed)
+
+        def show_failed(message: str, failed: list[FileImportResult]):
+            button_close = StyledButton("Закрыть")
+            dialog = StyledAlertDialog(
+                modal=True,
+                title=ft.Text(message, text_align=ft.TextAlign.CENTER),
+                content=ft.Column(
+                    tight=True,
+                    scroll=ft.ScrollMode.AUTO,
+                    controls=[
+                        ft.Text(f"Не прочитано файлов: {len(failed)}"),
+                        *(
+                            ft.Text(f"{os.path.basename(result.path)}: {result.error}")
+                            for result in failed
+                        ),
+                    ],
+                ),
+                actions=[button_close],
+            )
+            button_close.on_click = lambda _: self.page.close(dialog)
+            self.page.open(dialog)
+
+        def choose_question_type(results: list[FileImportResult]):
+            # TODO: Доработать ПОПАП
+            button_practical = StyledButton("Практические")
+            button_theoretical = StyledButton("Теоретические")
+
+            button_practical.on_click = (
+                lambda e, qtype=QuestionType.PRACTICAL: on_click_save_to(e, qtype)
+            )
+            button_theoretical.on_click = (
+                lambda e, qtype=QuestionType.THEORETICAL: on_click_save_to(e, qtype)
+            )
+
+            dialog_content = ft.Row(expand=True)
+            dialog_content.controls = [button_practical, button_theoretical]
+            dialog = ft.AlertDialog(
+                shape=ft.RoundedRectangleBorder(radius=9),
+                content_padding=ft.padding.all(14),
+                action_button_padding=0,
+                actions_padding=0,
+                title=ft.Text("Тип вопросов"),
+                content=ft.Container(content=dialog_content, padding=9),
+            )
+            self.page.open(dialog)
+
+            def on_click_save_to(e, qtype):
+                self.page.close(dialog)
+                # INFO: запись в бд не блокирует интерфейс
+                self.page.run_thread(save_questions, results, qtype)
+
+        # INFO: разбор файлов не блокирует интерфейс
+        self.page.run_thread(parse_files)
 
     def on_click_open_textfield(self, e):
         textfield = ft.TextField(multiline=True, min_lines=10)
@@ -189,11 +410,10 @@ class EditQuestionsTabController:
             qtype = next(iter(question_type))
             questions_raw = textfield.value
 
-            if qtype == QuestionType.PRACTICAL.value:
-                questions = self.questions_practical
-            elif qtype == QuestionType.THEORETICAL.value:
-                questions = self.questions_theoretical
-            else:
+            if qtype not in (
+                QuestionType.PRACTICAL.value,
+                QuestionType.THEORETICAL.value,
+            ):
                 return
 
             button_save.disabled = True
@@ -210,11 +430,7 @@ class EditQuestionsTabController:
                 button_save.update()
                 return
 
-            self.sqlite.add_list(values, QuestionType(qtype))
-
-            questions.clear()
-            questions.update(self.sqlite.read_questions_dict(QuestionType(qtype)))
-            self.refresh_table(questions, QuestionType(qtype), refresh_questions=False)
+            self.questions_repo.add_list(values, QuestionType(qtype))
             logging.info(f"Сохранённые значения: {values}")
             self.page.close(dialog)
 
@@ -255,28 +471,30 @@ class EditQuestionsTabController:
         overlay.update()
 
         file_picker.pick_files(
-            allow_multiple=False,
+            allow_multiple=True,
             allowed_extensions=["docx", "txt"],
             dialog_title="Вопросы к промежуточной аттестации",
         )
 
-    def delete_question_by_type(self, question_type: QuestionType):
-        if question_type == QuestionType.PRACTICAL:
-            selected_rows_copy = self.selected_rows_practical.copy()
-            questions = self.questions_practical
-        elif question_type == QuestionType.THEORETICAL:
-            selected_rows_copy = self.selected_rows_theoretical.copy()
-            questions = self.questions_theoretical
+    def on_click_upload_folder(
+        self, e, file_picker: ft.FilePicker, overlay: ft.Container
+    ):
+        overlay.visible = True
+        overlay.update()
 
-        for idx, bool in selected_rows_copy.items():
-            if not bool:
-                continue
+        file_picker.get_directory_path(
+            dialog_title="Папка с вопросами к промежуточной аттестации",
+        )
 
-            questions.pop(idx)
-            self.sqlite.remove_by_id(idx)
+    def delete_question_by_type(self, question_type: QuestionType) -> int:
+        """Удаляет выбранные вопросы, возвращает количество удалённых"""
+        if question_type == QuestionType.PRACTICAL:
+            selected_rows = self.selected_rows_practical
+        elif question_type == QuestionType.THEORETICAL:
+            selected_rows = self.selected_rows_theoretical
 
-        selected_rows_copy.clear()
-        self.refresh_table(questions, question_type, refresh_questions=False)
+        ids = [idx for idx, selected in selected_rows.items() if selected]
+        return self.questions_repo.remove_by_ids(ids)
 
     def on_click_button_delete(self, e):
         if not any(self.selected_rows_practical.values()) and not any(
@@ -286,18 +504,23 @@ class EditQuestionsTabController:
             logging.info("Вопросы не выбраны")
             return
 
+        removed = 0
         if any(self.selected_rows_practical.values()):
-            self.delete_question_by_type(QuestionType.PRACTICAL)
-            self.selected_rows_practical.update
+            removed += self.delete_question_by_type(QuestionType.PRACTICAL)
         if any(self.selected_rows_theoretical.values()):
-            self.delete_question_by_type(QuestionType.THEORETICAL)
-            self.selected_rows_theoretical.update
+            removed += self.delete_question_by_type(QuestionType.THEORETICAL)
+
+        logging.info(f"Удалено вопросов: {removed}")
+        self.page.open(WarnPopup(f"Удалено вопросов: {removed}"))
 
     def get_edit_questions_table(
         self, question_type: QuestionType
     ) -> tuple[ft.DataTable, dict[int, str]]:
         """
-        Возвращает DataTable и вопросы в dict[id, вопрос]
+        Возвращает DataTable и изменённые вопросы в dict[id, вопрос]
+
+        Словарь заполняется по мере правки полей, поле, возвращённое
+        к исходному тексту, из него удаляется.
         """
         if question_type == QuestionType.PRACTICAL:
             selected_rows = self.selected_rows_practical
@@ -306,9 +529,9 @@ class EditQuestionsTabController:
             selected_rows = self.selected_rows_theoretical
             questions_label = ft.Text("Теоретические Вопросы")
 
-        questions = self.sqlite.read_questions_dict(question_type)
+        questions = self.questions_repo.read_questions_dict(question_type)
         new_questions = get_selected_row_questions(questions, selected_rows)
-        textfield_storage: dict[int, str] = dict(new_questions)
+        edited: dict[int, str] = {}
         items_len = len(new_questions)
 
         data_table = ft.DataTable(
@@ -322,7 +545,11 @@ class EditQuestionsTabController:
         data_table.rows = []
 
         def on_textfield_change(e):
-            textfield_storage[e.control.data] = e.control.value
+            question_id = e.control.data
+            if e.control.value == str(new_questions[question_id]):
+                edited.pop(question_id, None)
+            else:
+                edited[question_id] = e.control.value
 
         for cell_index, (question_id, question) in enumerate(new_questions.items()):
             reversed_cell_id = items_len - cell_index
@@ -338,7 +565,7 @@ class EditQuestionsTabController:
                     cells=[ft.DataCell(ft.Text(str(reversed_cell_id))), ft.DataCell(tf)]
                 )
             )
-        return data_table, textfield_storage
+        return data_table, edited
 
     def on_click_button_edit(self, e):
         tables_data = {}
@@ -363,18 +590,16 @@ class EditQuestionsTabController:
             actions=[ft.Row([button_save, button_close])],
         )
 
-        # INFO: МОЖНО ОПТИМИЗИРОВАТЬ
         def on_click_button_save(tables_questions: dict, popup, e):
-            if QuestionType.PRACTICAL in tables_questions:
-                qtype = QuestionType.PRACTICAL
-                self.sqlite.edit_questions(tables_questions[qtype])
-                self.refresh_table(self.questions_theoretical, qtype)
-
-            if QuestionType.THEORETICAL in tables_questions:
-                qtype = QuestionType.THEORETICAL
-                self.sqlite.edit_questions(tables_questions[qtype])
-                self.refresh_table(self.questions_practical, qtype)
+            # INFO: в бд уходят только изменённые поля обеих таблиц, одной транзакцией
+            edited: dict[int, str] = {}
+            for questions in tables_questions.values():
+                edited.update(questions)
+
+            modified = self.questions_repo.edit_questions(edited) if edited else 0
+            logging.info(f"Изменено вопросов: {modified}")
             self.page.close(popup)
+            self.page.open(WarnPopup(f"Изменено вопросов: {modified}"))
 
         if not any(self.selected_rows_practical.values()) and not any(
             self.selected_rows_theoretical.values()
@@ -465,18 +690,12 @@ class EditQuestionsTabController:
 
             if qtype == QuestionType.PRACTICAL.value:
                 question_type = QuestionType.PRACTICAL
-                questions = self.questions_practical
             elif qtype == QuestionType.THEORETICAL.value:
                 question_type = QuestionType.THEORETICAL
-                questions = self.questions_theoretical
             else:
                 return
 
-            self.sqlite.add_list(values, question_type)
-            questions.clear()
-            questions.update(self.sqlite.read_questions_dict(question_type))
-
-            self.refresh_table(questions, question_type, refresh_questions=False)
+            self.questions_repo.add_list(values, question_type)
             logging.info(f"Сохранённые значения: {values}")
             self.page.close(alert_layout)
 
@@ -507,13 +726,13 @@ class EditQuestionsTabController:
 
 class TabEditQuestions(EditQuestionsTabController):
     def __init__(self, page: ft.Page, tab_label: ft.Text) -> None:
-        self.sqlite = SqliteData()
+        self.questions_repo = get_question_repository()
         self.tab_label = tab_label
 
-        self.questions_practical = self.sqlite.read_questions_dict(
+        self.questions_practical = self.questions_repo.read_questions_dict(
             QuestionType.PRACTICAL
         )
-        self.questions_theoretical = self.sqlite.read_questions_dict(
+        self.questions_theoretical = self.questions_repo.read_questions_dict(
             QuestionType.THEORETICAL
         )
 
@@ -524,6 +743,12 @@ class TabEditQuestions(EditQuestionsTabController):
             idx: False for idx in self.questions_theoretical.keys()
         }
 
+        self.data_rows = {question_type: {} for question_type in QuestionType}
+        self.rows_start = dict.fromkeys(QuestionType, 0)
+        self.rows_limit = {
+            question_type: ROWS_PAGE_SIZE for question_type in QuestionType
+        }
+        self.list_views = {}
         self.table_practical = self.get_data_table(QuestionType.PRACTICAL)
         self.table_theoretical = self.get_data_table(QuestionType.THEORETICAL)
 
@@ -568,19 +793,33 @@ class TabEditQuestions(EditQuestionsTabController):
             icon=ft.Icons.FILE_UPLOAD,
             on_click=lambda e: self.on_click_upload(e, filepicker, overlay),
         )
+        self.button_upload_folder = StyledButton(
+            text="Папка",
+            icon=ft.Icons.FOLDER_OPEN,
+            on_click=lambda e: self.on_click_upload_folder(e, filepicker, overlay),
+        )
+
+        self.textfield_search = StyledTextField(
+            hint_text="Поиск вопросов",
+            prefix_icon=ft.Icons.SEARCH,
+            dense=True,
+            on_change=self.on_change_search,
+        )
 
     def get_data_table(self, question_type: QuestionType) -> ft.DataTable:
         data_table = ft.DataTable(
             expand=True,
             vertical_lines=ft.BorderSide(1, ft.Colors.INVERSE_PRIMARY),
             horizontal_lines=ft.BorderSide(1, "dark"),
+            data_row_min_height=ROW_HEIGHT,
+            data_row_max_height=ROW_HEIGHT,
             show_checkbox_column=True,
             on_select_all=lambda e: self.toggle_all(e, question_type),
             columns=[
                 ft.DataColumn(ft.Text("№"), numeric=True),
             ],
             rows=self._build_data_rows(
-                questions_dict=self.sqlite.read_questions_dict(question_type),
+                questions_dict=self.questions_repo.read_questions_dict(question_type),
                 question_type=question_type,
             ),
         )
@@ -594,41 +833,89 @@ class TabEditQuestions(EditQuestionsTabController):
     def _build_data_rows(
         self, questions_dict: dict[int, Any], question_type: QuestionType
     ) -> list[ft.DataRow]:
+        """
+        Возвращает строки таблицы, переиспользуя уже созданные.
+
+        Строки хранятся в self.data_rows по id вопроса, у существующих строк
+        меняются только изменившиеся значения, поэтому update() таблицы
+        отправляет клиенту лишь разницу. Создаются только строки окна
+        self.rows_start, self.rows_limit, остальные -- при прокрутке.
+        """
+        if question_type == QuestionType.PRACTICAL:
+            selected_rows = self.selected_rows_practical
+        elif question_type == QuestionType.THEORETICAL:
+            selected_rows = self.selected_rows_theoretical
+
+        cached_rows = self.data_rows[question_type]
+        # INFO: в кэше остаются только строки окна, иначе после прокрутки
+        # всего банка в памяти оказались бы строки всех вопросов
+        window_rows: dict[int, ft.DataRow] = {}
         items = questions_dict.items()
         items_len = len(items)
+        start = self.rows_start[question_type]
         rows: list[ft.DataRow] = []
 
-        for cell_index, (question_id, question) in enumerate(items):
-            reversed_cell_id = items_len - cell_index
-            cell_question = ft.Text(value=str(question), tooltip=str(question))
-
-            row_cells = [
-                ft.DataCell(ft.Text(str(reversed_cell_id))),
-                ft.DataCell(cell_question),
-            ]
-            row = ft.DataRow(row_cells, data=question_id)
-
-            if question_type == QuestionType.PRACTICAL:
-                row.on_select_changed = lambda e, rid=question_id: self.toggle_row(
-                    rid, self.selected_rows_practical, question_type
-                )
-                row.selected = self.selected_rows_practical.get(question_id)
-            elif question_type == QuestionType.THEORETICAL:
-                row.on_select_changed = lambda e, rid=question_id: self.toggle_row(
-                    rid, self.selected_rows_theoretical, question_type
+        visible_items = itertools.islice(
+            items, start, start + self.rows_limit[question_type]
+        )
+        for cell_index, (question_id, question) in enumerate(visible_items, start):
+            reversed_cell_id = str(items_len - cell_index)
+            selected = selected_rows.get(question_id)
+            row = cached_rows.get(question_id)
+
+            if row is None:
+                cell_question = ft.Text(
+                    value=str(question),
+                    tooltip=str(question),
+                    max_lines=2,
+                    overflow=ft.TextOverflow.ELLIPSIS,
                 )
-                row.selected = self.selected_rows_theoretical.get(question_id)
+                row_cells = [
+                    ft.DataCell(ft.Text(reversed_cell_id)),
+                    ft.DataCell(cell_question),
+                ]
+                row = ft.DataRow(row_cells, data=question_id)
+                if question_type == QuestionType.PRACTICAL:
+                    row.on_select_changed = lambda e, rid=question_id: (
+                        self.toggle_row(
+                            rid, self.selected_rows_practical, question_type
+                        )
+                    )
+                elif question_type == QuestionType.THEORETICAL:
+                    row.on_select_changed = lambda e, rid=question_id: (
+                        self.toggle_row(
+                            rid, self.selected_rows_theoretical, question_type
+                        )
+                    )
+            else:
+                cell_num = row.cells[0].content
+                cell_question = row.cells[1].content
+                if cell_num.value != reversed_cell_id:
+                    cell_num.value = reversed_cell_id
+                if cell_question.value != str(question):
+                    cell_question.value = str(question)
+                    cell_question.tooltip = str(question)
+
+            if row.selected != selected:
+                row.selected = selected
+            window_rows[question_id] = row
             rows.append(row)
+
+        self.data_rows[question_type] = window_rows
         return rows
 
     def get_tab_ui(self):
-        datatables = ft.Row(
-            expand=True,
-            controls=[
-                ft.ListView(expand=True, controls=[self.table_practical]),
-                ft.ListView(expand=True, controls=[self.table_theoretical]),
-            ],
-        )
+        for question_type, table in (
+            (QuestionType.PRACTICAL, self.table_practical),
+            (QuestionType.THEORETICAL, self.table_theoretical),
+        ):
+            self.list_views[question_type] = ft.ListView(
+                expand=True,
+                controls=[table],
+                on_scroll_interval=100,
+                on_scroll=lambda e, qtype=question_type: self.on_scroll_table(e, qtype),
+            )
+        datatables = ft.Row(expand=True, controls=list(self.list_views.values()))
         buttons = ft.Row(alignment=ft.MainAxisAlignment.CENTER)
         buttons.controls = [
             self.button_add,
@@ -636,10 +923,15 @@ class TabEditQuestions(EditQuestionsTabController):
             self.button_delete,
             self.button_paste,
             self.button_upload_docx,
+            self.button_upload_folder,
         ]
 
         content = ft.Column(expand=True, spacing=0)
         content.controls = [
+            ft.Container(
+                margin=ft.margin.only(9, 9, 9, 0),
+                content=self.textfield_search,
+            ),
             datatables,
             ft.Container(
                 margin=ft.margin.only(9, 9, 9, 9),